@@ -1,20 +1,67 @@
 import urllib
+try:
+    # urllib.request is not loaded by importing urllib alone in python 3
+    import urllib.request
+except ImportError:
+    pass
 import sys
 from functools import wraps
 import inspect
-# Pandas became an optional dependency, but we still want to track it
-try:
-    import pandas
-    _PANDAS_FOUND = True
-except ImportError:
-    _PANDAS_FOUND = False
-import csv
+import re
+import socket
+import threading
+import time
+from functools import partial
+from collections import OrderedDict
+from .errors import (InvalidRequestError, InformationError, ThrottleError,
+                     EmptyResponseError)
+from .history import merge_history
+from .keypool import KeyPool
+from .lazy import LazyModule, module_found
+from .retrypolicy import RetryPolicy
+from .compact import COMPACT_MODES, compact_arrays, compact_frame
+from .csvparser import CsvParser, CsvRows, parse_csv
+from .decoders import get_decoder
+from .schemas import normalize_name, schema_for
+from .seriesparser import SeriesColumns, SeriesParser, parse_series
+from .transfer import ACCEPT_ENCODING, DecodedResponse, TransferStats
+# Pandas became an optional dependency, but we still want to track it. It is
+# only imported once a pandas output is built
+pandas = LazyModule('pandas')
+_PANDAS_FOUND = module_found('pandas')
+# Numpy comes with pandas, but the numpy output format only needs numpy
+numpy = LazyModule('numpy')
+_NUMPY_FOUND = module_found('numpy')
+# Only needed by the _many calls and the hedged calls
+futures = LazyModule('concurrent.futures')
+# The threads of the hedged calls, shared by all the instances and created
+# on the first hedged call
+_HEDGE_EXECUTOR = None
+_HEDGE_EXECUTOR_LOCK = threading.Lock()
+# Seconds a hedged call waits for the server to send data when it has no
+# deadline and the transport has no read timeout of its own, like urllib
+_HEDGE_TIMEOUT = 60
+
+
+def _hedge_executor():
+    """ Return the thread pool of the hedged calls, creating it if needed
+    """
+    global _HEDGE_EXECUTOR
+    with _HEDGE_EXECUTOR_LOCK:
+        if _HEDGE_EXECUTOR is None:
+            _HEDGE_EXECUTOR = futures.ThreadPoolExecutor(max_workers=16)
+        return _HEDGE_EXECUTOR
+
+
+class _NotModified(object):
+    """ Returned instead of the parsed response when its data did not change
+    since the output being revalidated was built. It keeps the body, to be
+    parsed if that output is not cached anymore.
+    """
 
-# Avoid compability issues
-if sys.version_info.major == 3 and sys.version_info.minor == 6:
-    from json import loads
-else:
-    from simplejson import loads
+    def __init__(self, url_response, url=None):
+        self.url_response = url_response
+        self.url = url
 
 
 class AlphaVantage(object):
@@ -26,57 +73,266 @@ class AlphaVantage(object):
                                'T3', 'KAMA', 'MAMA']
     _ALPHA_VANTAGE_DIGITAL_CURRENCY_LIST = \
         "https://www.alphavantage.co/digital_currency_list/"
+    _ALPHA_VANTAGE_PHYSICAL_CURRENCY_LIST = \
+        "https://www.alphavantage.co/physical_currency_list/"
+    # The api tells about exceeded quotas with an informative message
+    _THROTTLE_MESSAGE = re.compile(
+        r'call frequency|rate limit|per minute|per day', re.IGNORECASE)
+    _API_KEY_PARAMETER = re.compile(r'&apikey=[^&]*')
+    # Like "3. Last Refreshed" in the meta data, at the top of the response
+    _LAST_REFRESHED = re.compile(r'Last Refreshed"\s*:\s*"([^"]*)"')
 
     def __init__(self, key=None, retries=5, output_format='json',
-                 treat_info_as_error=True, indexing_type='date'):
+                 treat_info_as_error=True, indexing_type='date',
+                 transport=None, rate_limiter=None, retry_policy=None,
+                 transfer_stats=None, single_flight=None, hedge_after=None,
+                 cache=None, result_cache=None, history_store=None,
+                 column_store=None, symbol_directory=None, datatype='json',
+                 normalize_columns=False, compact=None, json_decoder=None):
         """ Initialize the class
 
         Keyword Arguments:
-            key:  Alpha Vantage api key
+            key:  Alpha Vantage api key, or a KeyPool to spread the calls
+                across several keys
             retries:  Maximum amount of retries in case of faulty connection or
-                server not able to answer the call.
+                server not able to answer the call. Ignored if a retry_policy
+                is given.
             treat_info_as_error: Treat information from the api as errors
-            output_format:  Either 'json', 'pandas' os 'csv'
-            indexing_type: Either 'date' to use the default date string given
-            by the alpha vantage api call or 'integer' if you just want an
+            output_format:  Either 'json', 'pandas', 'numpy' or 'csv'. The
+                numpy output is a dictionary of arrays, the datetime64 dates
+                under 'date' and a float64 array per column
+            indexing_type: Either 'date' to use the dates given by the alpha
+            vantage api call, as a DatetimeIndex in the time zone of the meta
+            data sorted in ascending order, or 'integer' if you just want an
             integer indexing on your dataframe. Only valid, when the
             output_format is 'pandas'.
+            transport: Object used to open the urls of the api calls, for
+            example a ConnectionPool shared by several instances to reuse
+            keep-alive connections. It must implement urlopen(url, headers)
+            returning a file like response. If None, every call opens a new
+            connection with urllib (default None).
+            rate_limiter: RateLimiter that every call waits for before it is
+            sent, give the same limiter to several instances so that they
+            share the quota (default None)
+            retry_policy: RetryPolicy deciding which failed calls are retried
+            and how long to wait before that. If None, a RetryPolicy with
+            the given amount of retries is used (default None)
+            transfer_stats: TransferStats counting the bytes received before
+            and after decompression, give the same one to several instances
+            to monitor them together. If None, the instance counts its own
+            (default None)
+            single_flight: SingleFlight that coalesces identical calls in
+            flight at the same time, so that they are sent only once. Give
+            the same one to several instances to coalesce their calls too.
+            If None, every call is sent (default None)
+            hedge_after: Seconds after which a call still waiting for its
+            response is sent a second time, keeping whichever response
+            arrives first. Set it around the 95th percentile of the response
+            times to cut the slowest calls. The duplicate is only sent if the
+            rate limiter or key pool has budget left right away. Without a
+            deadline, hedged calls give up after the read timeout of the
+            transport (60 seconds with urllib). If None, calls are never
+            duplicated (default None)
+            cache: DiskCache keeping the api responses until they expire,
+            the calls found in it skip the network. Give the same one to
+            several instances to share it (default None)
+            result_cache: ResultCache keeping the formatted outputs (like
+            the pandas data frames) in memory, the calls found in it skip
+            both the network and the parsing (default None)
+            history_store: HistoryStore keeping the full series, then the
+            calls with outputsize='full' only download the compact series
+            (the last 100 points) and merge it into the stored one. The full
+            series is downloaded again when the compact one does not reach
+            the stored points (default None)
+            column_store: ColumnStore keeping the pandas outputs of the time
+            series as memory mapped column files, the calls found fresh in it
+            skip the network and the parsing (default None)
+            symbol_directory: SymbolDirectory rejecting the calls with
+            unknown currencies or symbols recently rejected by the api
+            before they are sent (default None)
+            datatype: Either 'json' or 'csv', the format the api responses
+            are requested in. The csv responses are smaller, they can be
+            used for the pandas and numpy outputs of the time series and
+            cryptocurrencies, which then have no meta data. The csv output
+            always uses csv (default 'json')
+            normalize_columns: Give the columns of the pandas and numpy
+            outputs their normalized names, like 'adjusted_close' instead of
+            '5. adjusted close', which are also the names of the csv
+            responses (default False)
+            compact: Store the columns of the pandas and numpy outputs in
+            smaller dtypes. Either None to keep them all float64, 'lossless'
+            to store the volumes as uint32 (int64 if they do not fit) or
+            'float32' to also store the prices as float32, which keeps about
+            7 significant digits (default None)
+            json_decoder: The json decoder of the responses, either the name
+            of one registered in alpha_vantage.decoders ('orjson', 'json',
+            'ujson' or 'simplejson') or a function like json.loads. If None,
+            the fastest one installed is used (default None)
+
+        Every get_* call also accepts a deadline keyword argument, the
+        maximum amount of seconds for the call including all its retries.
         """
         if key is None:
             raise ValueError(
                 'Get a free key from the alphavantage website:'
                 ' https://www.alphavantage.co/support/#api-key')
+        if isinstance(key, KeyPool):
+            # The key of every call is chosen from the pool when it is sent
+            self.key_pool = key
+            key = key.keys[0]
+        else:
+            self.key_pool = None
         self.key = key
-        self.retries = retries
+        if retry_policy is None:
+            retry_policy = RetryPolicy(retries=retries)
+        self.retry_policy = retry_policy
+        self.retries = retry_policy.retries
         self.output_format = output_format
         if self.output_format is 'pandas' and not _PANDAS_FOUND:
             raise ValueError("The pandas library was not found, therefore can "
                              "not be used as an output format, please install "
                              "manually")
+        if self.output_format.lower() == 'numpy' and not _NUMPY_FOUND:
+            raise ValueError("The numpy library was not found, therefore can "
+                             "not be used as an output format, please install "
+                             "manually")
+        if self.output_format.lower() == 'csv':
+            datatype = 'csv'
+        if datatype not in ('json', 'csv'):
+            raise ValueError("Data type: {} not recognized, only json and csv "
+                             "are supported".format(datatype))
+        if datatype == 'csv' and self.output_format.lower() == 'json':
+            raise ValueError("The json output format needs the json data "
+                             "type")
+        self.datatype = datatype
+        self.normalize_columns = normalize_columns
+        if compact not in COMPACT_MODES:
+            raise ValueError("Compact mode: {} not recognized, only 'lossless'"
+                             " and 'float32' are supported".format(compact))
+        self.compact = compact
+        if callable(json_decoder):
+            self.json_loads = json_decoder
+        else:
+            self.json_loads = get_decoder(json_decoder)
         self.treat_info_as_error = treat_info_as_error
         # Not all the calls accept a data type appended at the end, this
         # variable will be overriden by those functions not needing it.
         self._append_type = True
         self.indexing_type = indexing_type
+        self.transport = transport
+        self.rate_limiter = rate_limiter
+        if transfer_stats is None:
+            transfer_stats = TransferStats()
+        self.transfer_stats = transfer_stats
+        self.single_flight = single_flight
+        self.hedge_after = hedge_after
+        self.cache = cache
+        self.result_cache = result_cache
+        self.history_store = history_store
+        self.column_store = column_store
+        self.symbol_directory = symbol_directory
+
+    def __getattr__(self, name):
+        """ Give every get_* api call a get_*_many version, that calls it
+        for a list of symbols concurrently (see _fetch_many). For example
+        get_daily_many(symbols, outputsize='full')
+
+        Keyword Arguments:
+            name:  The name of the attribute that was not found
+        """
+        if name.startswith('get_') and name.endswith('_many'):
+            func = getattr(self, name[:-len('_many')], None)
+            if func is not None:
+                @wraps(func)
+                def _many_wrapper(symbols, *args, **kwargs):
+                    return self._fetch_many(func, symbols, *args, **kwargs)
+                _many_wrapper.__name__ = name
+                return _many_wrapper
+        raise AttributeError("'{}' object has no attribute '{}'".format(
+            type(self).__name__, name))
+
+    def _fetch_many(self, func, symbols, *args, **kwargs):
+        """ Call func once per symbol on a pool of worker threads, yielding
+        (symbol, result, error) tuples as the calls complete. Exactly one of
+        result and error is None, so that an error on one symbol does not
+        stop the others.
+
+        Keyword Arguments:
+            func:  The api call, it gets the symbol as its first argument
+            symbols:  The symbols to call the api for
+            max_workers:  Maximum amount of simultaneous calls (default 8)
+            args, kwargs:  The other arguments of the api call
+        """
+        max_workers = kwargs.pop('max_workers', 8)
+        executor = futures.ThreadPoolExecutor(max_workers=max_workers)
+        calls = {executor.submit(func, symbol, *args, **kwargs): symbol
+                 for symbol in symbols}
+        try:
+            for call in futures.as_completed(calls):
+                try:
+                    yield calls[call], call.result(), None
+                except Exception as err:
+                    yield calls[call], None, err
+        finally:
+            # Do not wait for the calls that did not start yet if the caller
+            # stops iterating early
+            for call in calls:
+                call.cancel()
+            executor.shutdown(wait=True)
 
     def _retry(func):
         """ Decorator for retrying api calls (in case of errors from the api
-        side in bringing the data)
+        side in bringing the data), following the retry policy of the
+        instance. The error of the last attempt is raised if the call can not
+        be retried anymore.
 
         Keyword Arguments:
-            func:  The function to be retried
+            func:  The function to be retried, the time by which all the
+                attempts must be done is taken from its deadline keyword
+                argument
         """
         @wraps(func)
         def _retry_wrapper(self, *args, **kwargs):
-            error_message = ""
-            for retry in range(self.retries + 1):
+            start = time.time()
+            deadline = kwargs.get('deadline')
+            attempt = 0
+            while True:
                 try:
                     return func(self, *args, **kwargs)
-                except ValueError as err:
-                    error_message = str(err)
-            raise ValueError(str(error_message))
+                except Exception as err:
+                    delay = self._retry_delay(attempt, err, start,
+                                              deadline=deadline)
+                    if delay is None:
+                        raise
+                time.sleep(delay)
+                attempt += 1
         return _retry_wrapper
 
+    def _retry_delay(self, attempt, error, start, retryable=None,
+                     deadline=None):
+        """ Return the seconds to wait before retrying a failed call, or None
+        if it must not be retried. Throttled calls are parked until the rate
+        limiter of the instance, if any, has a token again, after telling it
+        that its budget was used up.
+
+        Keyword Arguments:
+            attempt:  Number of retries already done
+            error:  The exception raised by the last attempt
+            start:  The time of the first attempt
+            retryable:  Whether the error is transient, None to let the retry
+                policy classify it (default None)
+            deadline:  The time by which all the attempts must be done, None
+                to use the deadline of the retry policy (default None)
+        """
+        if isinstance(error, ThrottleError):
+            if self.key_pool is not None and error.api_key is not None:
+                error.retry_after = self.key_pool.throttled(error.api_key)
+            elif self.rate_limiter is not None:
+                error.retry_after = self.rate_limiter.throttled()
+        return self.retry_policy.next_delay(
+            attempt, error, time.time() - start, retryable,
+            deadline=None if deadline is None else deadline - start)
+
     @classmethod
     def _call_api_on_func(cls, func):
         """ Decorator for forming the api call with the arguments of the
@@ -106,8 +362,10 @@ class AlphaVantage(object):
                 defaults = argspec.defaults
         # Actual decorating
 
-        @wraps(func)
-        def _call_wrapper(self, *args, **kwargs):
+        def _request_url(self, args, kwargs):
+            """ Return the url of the api call for the arguments of the
+            function, together with its data and meta data keys
+            """
             used_kwargs = kwargs.copy()
             # Get the used positional arguments given to the function
             used_kwargs.update(zip(argspec.args[positional_count:],
@@ -138,20 +396,30 @@ class AlphaVantage(object):
                     # internal defined parameter)
                     url = '{}&{}={}'.format(url, arg_name, arg_value)
             # Allow the output format to be json or csv (supported by
-            # alphavantage api). Pandas is simply json converted.
-            if 'json' or 'csv' in self.output_format.lower():
-                oformat = self.output_format.lower()
-            elif 'pandas' in self.output_format.lower():
-                oformat = 'json'
+            # alphavantage api). Pandas and numpy are converted from json, or
+            # from csv when it is the data type of the instance.
+            if self.output_format.lower() in ('json', 'csv', 'pandas',
+                                              'numpy'):
+                oformat = self.datatype
             else:
                 raise ValueError("Output format: {} not recognized, only json,"
-                                 "pandas and csv are supported".format(
+                                 " pandas, numpy and csv are supported".format(
                                      self.output_format.lower()))
             if self._append_type:
                 url = '{}&apikey={}&datatype={}'.format(url, self.key, oformat)
             else:
                 url = '{}&apikey={}'.format(url, self.key)
-            return self._handle_api_call(url), data_key, meta_data_key
+            return url, data_key, meta_data_key
+
+        @wraps(func)
+        def _call_wrapper(self, *args, **kwargs):
+            # The deadline is an option of the call, not an api parameter
+            deadline = kwargs.pop('deadline', None)
+            url, data_key, meta_data_key = _request_url(self, args, kwargs)
+            return self._call_api(url, deadline), data_key, meta_data_key
+        # The output format decorators build the url without calling the api
+        # to look up their result cache first
+        _call_wrapper.request_url = _request_url
         return _call_wrapper
 
     @classmethod
@@ -165,39 +433,395 @@ class AlphaVantage(object):
         """
         @wraps(func)
         def _format_wrapper(self, *args, **kwargs):
+            return self._format_call(func, args, kwargs, self._format_output,
+                                     override)
+        return _format_wrapper
+
+    def _format_call(self, func, args, kwargs, callback, override=None):
+        """ Call the api through the function decorated by _call_api_on_func
+        and give the response to the callback that formats it. With a result
+        cache or a column store, the output is looked up in them before
+        calling the api and stored once it is built.
+
+        Keyword Arguments:
+            func:  The function decorated by _call_api_on_func
+            args, kwargs:  The arguments of the function
+            callback:  The function that formats the response
+            override:  Override the internal format of the call, default None
+        """
+        if self.result_cache is None and self.column_store is None:
             call_response, data_key, meta_data_key = func(
                 self, *args, **kwargs)
-            if 'json' in self.output_format.lower() or 'pandas' \
-                    in self.output_format.lower():
+            return self._on_response(call_response, callback, data_key,
+                                     meta_data_key, override)
+        kwargs = kwargs.copy()
+        deadline = kwargs.pop('deadline', None)
+        url, data_key, meta_data_key = func.request_url(self, args, kwargs)
+        request_key = self._request_key(url)
+        key = (request_key, callback.__name__, self.output_format.lower(),
+               self.indexing_type, self.normalize_columns, self.compact,
+               override)
+        last_refreshed = None
+        if self.result_cache is not None:
+            result = self.result_cache.get(key)
+            if result is not None:
+                return self._on_result(result)
+            # An expired output is given back if the data did not change
+            last_refreshed = self._last_refreshed(
+                self.result_cache.get_stale_meta_data(key))
+        # Only the time series data frames are kept in the column store
+        if self.column_store is not None and override is None and \
+                callback == self._format_output and \
+                self.output_format.lower() == 'pandas':
+            stored = self.column_store.get(request_key)
+            if stored is not None:
+                data_pandas, meta_data = stored
+                return self._on_result(self._store_result(
+                    key, (self._index_data_frame(data_pandas), meta_data)))
+            callback = partial(self._format_columns, request_key)
+        return self._on_response(
+            self._call_api(url, deadline, last_refreshed),
+            self._format_and_store, key, callback, data_key, meta_data_key,
+            override)
+
+    def _format_and_store(self, call_response, key, callback, *args):
+        """ Format the response with the callback and store the output in
+        the result cache, if any. When the response did not change since the
+        output in the result cache was built, that output is given back
+        instead, unless it was evicted in the meantime.
+
+        Keyword Arguments:
+            call_response:  The response returned by _handle_api_call
+            key:  The key of the output in the result cache
+            callback:  The function that formats the response
+            args:  Extra arguments for the callback
+        """
+        if isinstance(call_response, _NotModified):
+            result = self.result_cache.revalidate(key)
+            if result is not None:
+                return result
+            call_response = self._parse_response(call_response.url_response,
+                                                 call_response.url)
+        return self._store_result(key, callback(call_response, *args))
+
+    def _last_refreshed(self, meta_data):
+        """ Return the last refreshed time in the meta data of an output, or
+        None if it has none.
+
+        Keyword Arguments:
+            meta_data:  The meta data of the output of a call
+        """
+        if not isinstance(meta_data, dict):
+            return None
+        for field, value in meta_data.items():
+            if field.endswith('Last Refreshed'):
+                return value
+        return None
+
+    def _store_result(self, key, result):
+        """ Store an output in the result cache of the instance, if any,
+        returning a copy of it to the caller.
+
+        Keyword Arguments:
+            key:  The key of the output in the result cache
+            result:  The formatted output
+        """
+        if self.result_cache is None:
+            return result
+        return self.result_cache.set(key, result)
+
+    def _format_columns(self, request_key, call_response, data_key,
+                        meta_data_key, override=None):
+        """ Give the response its pandas format, storing the data frame in
+        the column store of the instance.
+
+        Keyword Arguments:
+            request_key:  The url of the call without its api key
+            call_response:  The response returned by _handle_api_call
+            data_key:  The key for getting the data from the json object
+            meta_data_key:  The key for getting the meta data information out
+            of the json object
+            override:  Override the internal format of the call, default None
+        """
+        if isinstance(call_response, SeriesColumns):
+            # Parsed from a csv response, it has no meta data
+            data, meta_data = call_response, None
+        else:
+            data = call_response[data_key]
+            meta_data = call_response[meta_data_key] if meta_data_key \
+                else None
+        data_pandas = self._data_frame(data, meta_data)
+        self.column_store.set(request_key, data_pandas, meta_data)
+        return self._index_data_frame(data_pandas), meta_data
+
+    def _request_key(self, url):
+        """ Return the normalized request of an api call: its url without
+        the api key, which identifies the same request done with any key.
+
+        Keyword Arguments:
+            url:  The url of the service
+        """
+        return self._API_KEY_PARAMETER.sub('', url)
+
+    def _with_api_key(self, url, key):
+        """ Return the url of the api call using the given api key
+
+        Keyword Arguments:
+            url:  The url of the service
+            key:  The api key
+        """
+        return self._API_KEY_PARAMETER.sub(
+            lambda _: '&apikey={}'.format(key), url)
+
+    def _call_api(self, url, deadline=None, last_refreshed=None):
+        """ Call the api, coalescing the call with an identical one in
+        flight when the instance has a single flight group.
+
+        Keyword Arguments:
+            url:  The url of the service
+            deadline:  Maximum amount of seconds for the call including all
+                its retries, None for no limit (default None)
+            last_refreshed:  The last refreshed time of the output being
+                revalidated, see _handle_api_call (default None)
+        """
+        if deadline is not None:
+            deadline = time.time() + deadline
+        # The response is parsed according to the output of the instance, so
+        # only the calls of instances parsing it the same way are coalesced
+        key = (self._request_key(url), self._series_parser(),
+               self.output_format.lower(), self.datatype)
+        if self.history_store is not None and 'outputsize=full' in url and \
+                'datatype=csv' not in url:
+            call = partial(self._sync_history, url, deadline=deadline)
+        else:
+            call = partial(self._handle_api_call, url, deadline=deadline,
+                           last_refreshed=last_refreshed)
+            if last_refreshed is not None:
+                # Only coalesced with the calls revalidating the same output
+                key = (key, last_refreshed)
+        if self.single_flight is None:
+            return call()
+        return self.single_flight.do(key, call)
+
+    def _sync_history(self, url, deadline=None):
+        """ Return the full series of the call from the history store of the
+        instance, refreshed with a compact call. The full series is only
+        downloaded when it is not stored yet or it can not be merged.
+
+        Keyword Arguments:
+            url:  The url of the full call
+            deadline:  The time by which the call must be done, None for no
+                limit (default None)
+        """
+        key = self._request_key(url)
+        history = self.history_store.get(key)
+        if history is not None:
+            update = self._handle_api_call(
+                url.replace('outputsize=full', 'outputsize=compact'),
+                deadline=deadline)
+            history = merge_history(history, update, 'ADJUSTED' in key)
+        if history is None:
+            history = self._handle_api_call(url, deadline=deadline)
+        self.history_store.set(key, history)
+        return history
+
+    def _on_response(self, call_response, callback, *args):
+        """ Give the response of an api call to the callback that processes
+        it. The asynchronous clients override it, since their response is an
+        awaitable that has to be resolved first.
+
+        Keyword Arguments:
+            call_response:  The response returned by _handle_api_call
+            callback:  The function that processes the response
+            args:  Extra arguments for the callback
+        """
+        return callback(call_response, *args)
+
+    def _on_result(self, result):
+        """ Return an output found in the result cache. The asynchronous
+        clients override it to return an awaitable instead.
+
+        Keyword Arguments:
+            result:  The output found in the cache
+        """
+        return result
+
+    def _format_output(self, call_response, data_key, meta_data_key,
+                       override=None):
+        """ Give the response of an api call its right format, either json,
+        pandas or numpy
+
+        Keyword Arguments:
+            call_response:  The response returned by _handle_api_call
+            data_key:  The key for getting the data from the json object
+            meta_data_key:  The key for getting the meta data information out
+            of the json object
+            override:  Override the internal format of the call, default None
+        """
+        if 'json' in self.output_format.lower() or 'pandas' \
+                in self.output_format.lower() or 'numpy' \
+                in self.output_format.lower():
+            if isinstance(call_response, SeriesColumns):
+                # Parsed from a csv response, it has no meta data
+                data, meta_data = call_response, None
+            else:
                 data = call_response[data_key]
                 if meta_data_key is not None:
                     meta_data = call_response[meta_data_key]
                 else:
                     meta_data = None
-                # Allow to override the output parameter in the call
-                if override is None:
-                    output_format = self.output_format.lower()
-                elif 'json' or 'pandas' in override.lower():
-                    output_format = override.lower()
-                # Choose output format
-                if output_format == 'json':
-                    return data, meta_data
-                elif output_format == 'pandas':
-                    data_pandas = pandas.DataFrame.from_dict(data,
-                                                             orient='index',
-                                                             dtype=float)
-                    data_pandas.index.name = 'date'
-                    if 'integer' in self.indexing_type:
-                        # Set Date as an actual column so a new numerical index
-                        # will be created, but only when specified by the user.
-                        data_pandas.reset_index(level=0, inplace=True)
-                    return data_pandas, meta_data
-            elif 'csv' in self.output_format.lower():
-                return call_response, None
-            else:
-                raise ValueError('Format: {} is not supported'.format(
-                    self.output_format))
-        return _format_wrapper
+            # Allow to override the output parameter in the call
+            if override is None:
+                output_format = self.output_format.lower()
+            elif 'json' or 'pandas' in override.lower():
+                output_format = override.lower()
+            # Choose output format
+            if output_format == 'json':
+                return data, meta_data
+            elif output_format == 'pandas':
+                return (self._index_data_frame(
+                    self._data_frame(data, meta_data)), meta_data)
+            elif output_format == 'numpy':
+                return self._arrays(data, meta_data), meta_data
+        elif 'csv' in self.output_format.lower():
+            return call_response, None
+        else:
+            raise ValueError('Format: {} is not supported'.format(
+                self.output_format))
+
+    def _data_frame(self, data, meta_data=None):
+        """ Return the data frame of the data of a response, indexed by date
+        in ascending order
+
+        Keyword Arguments:
+            data:  The data of the json response, or its SeriesColumns
+            meta_data:  The meta data of the response, giving the time zone
+                of the dates (default None)
+        """
+        if isinstance(data, SeriesColumns):
+            # Already parsed into a float array, it is not copied unless
+            # coalesced calls share the response
+            data_pandas = pandas.DataFrame(
+                data.values, index=data.index, columns=data.columns,
+                copy=self.single_flight is not None)
+        else:
+            data_pandas = pandas.DataFrame.from_dict(data, orient='index',
+                                                     dtype=float)
+        data_pandas.index = self._date_index(data_pandas.index, meta_data)
+        data_pandas.index.name = 'date'
+        if data_pandas.index.is_monotonic_decreasing:
+            # The api gives the newest dates first, reversed without sorting
+            return data_pandas.iloc[::-1]
+        elif not data_pandas.index.is_monotonic_increasing:
+            return data_pandas.sort_index()
+        return data_pandas
+
+    def _date_index(self, dates, meta_data=None):
+        """ Return the DatetimeIndex of the dates of a series, localized in
+        the time zone of its meta data. The times that are ambiguous or do
+        not exist in the time zone, around its daylight saving time changes,
+        become NaT, and the index stays naive if the time zone is unknown.
+        The formats of the api are parsed vectorized by numpy, other formats
+        by pandas. Dates that can not be parsed are left as they are.
+
+        Keyword Arguments:
+            dates:  The dates of the series
+            meta_data:  The meta data of the response (default None)
+        """
+        try:
+            index = pandas.DatetimeIndex(numpy.array(dates,
+                                                     dtype='datetime64[ns]'))
+        except ValueError:
+            try:
+                index = pandas.to_datetime(dates)
+            except (TypeError, ValueError):
+                return pandas.Index(dates)
+        time_zone = self._time_zone(meta_data)
+        if time_zone is None:
+            return index
+        try:
+            if index.tz is not None:
+                # Dates given with their utc offset
+                return index.tz_convert(time_zone)
+            return index.tz_localize(time_zone, ambiguous='NaT',
+                                     nonexistent='NaT')
+        except LookupError:
+            # Unknown time zone, pytz.UnknownTimeZoneError and
+            # zoneinfo.ZoneInfoNotFoundError are both KeyError
+            return index
+
+    @staticmethod
+    def _time_zone(meta_data):
+        """ Return the time zone of the meta data of a response, like
+        "6. Time Zone": "US/Eastern", or None
+
+        Keyword Arguments:
+            meta_data:  The meta data of the response
+        """
+        if not isinstance(meta_data, dict):
+            return None
+        for field, value in meta_data.items():
+            if field.endswith('Time Zone'):
+                return value
+        return None
+
+    def _arrays(self, data, meta_data=None):
+        """ Return the data of a time series response as an ordered
+        dictionary of arrays, the datetime64 dates (in the time zone of the
+        api) under 'date' and a float64 array per column, in ascending order
+        of the dates. Data that is not a time series is returned as it is.
+
+        Keyword Arguments:
+            data:  The data of the json response, or its SeriesColumns
+            meta_data:  The meta data of the response (default None)
+        """
+        if not isinstance(data, SeriesColumns):
+            series = SeriesColumns.from_dict(data)
+            if series is None:
+                return data
+            data = series
+        arrays = data.arrays()
+        try:
+            arrays['date'] = arrays['date'].astype('datetime64[ns]')
+        except ValueError:
+            # Not a format of the api, the dates are left as they are
+            pass
+        dates = arrays['date']
+        if len(dates) > 1 and (dates[:-1] >= dates[1:]).all():
+            # The api gives the newest dates first, reversed without sorting
+            order = slice(None, None, -1)
+        elif (dates[:-1] <= dates[1:]).all():
+            order = slice(None)
+        else:
+            order = numpy.argsort(dates, kind='mergesort')
+        for column, array in arrays.items():
+            arrays[column] = array[order]
+        arrays = compact_arrays(arrays, self.compact)
+        if self.normalize_columns:
+            arrays = OrderedDict((normalize_name(column), array)
+                                 for column, array in arrays.items())
+        if self.single_flight is not None:
+            # Coalesced calls share the response
+            for column, array in arrays.items():
+                arrays[column] = array.copy()
+        return arrays
+
+    def _index_data_frame(self, data_pandas):
+        """ Give the data frame the indexing type, the column names and the
+        compact dtypes of the instance
+
+        Keyword Arguments:
+            data_pandas:  The data frame indexed by date
+        """
+        data_pandas = compact_frame(data_pandas, self.compact)
+        if self.normalize_columns:
+            data_pandas.columns = [normalize_name(column)
+                                   for column in data_pandas.columns]
+        if 'integer' in self.indexing_type:
+            # Set Date as an actual column so a new numerical index
+            # will be created, but only when specified by the user.
+            data_pandas.reset_index(level=0, inplace=True)
+        return data_pandas
 
     def map_to_matype(self, matype):
         """ Convert to the alpha vantage math type integer. It returns an
@@ -229,36 +853,327 @@ class AlphaVantage(object):
         return value
 
     @_retry
-    def _handle_api_call(self, url):
+    def _handle_api_call(self, url, deadline=None, last_refreshed=None):
         """ Handle the return call from the  api and return a data and meta_data
         object. It raises a ValueError on problems
 
         Keyword Arguments:
             url:  The url of the service
-            data_key:  The key for getting the data from the jso object
-            meta_data_key:  The key for getting the meta data information out
-            of the json object
+            deadline:  The time by which the call must be done, None for no
+                limit (default None)
+            last_refreshed:  The last refreshed time of the output being
+                revalidated. If the response has the same one, it is not
+                parsed and a _NotModified is returned instead (default None)
+        """
+        self._check_symbols(url)
+        cached_response = self._cached_response(url, last_refreshed)
+        if cached_response is not None:
+            return cached_response
+        if self.rate_limiter is not None:
+            self.rate_limiter.acquire(deadline)
+        api_key = None
+        if self.key_pool is not None:
+            api_key = self.key_pool.acquire(deadline)
+            url = self._with_api_key(url, api_key)
+        timeout = None
+        if deadline is not None:
+            timeout = deadline - time.time()
+            if timeout <= 0:
+                raise socket.timeout('The deadline of the call was exceeded')
+        parser = self._stream_parser(last_refreshed)
+        if self.hedge_after is None:
+            url_response = self._fetch(url, timeout, parser)
+        else:
+            url_response = self._fetch_hedged(url, timeout, parser)
+        try:
+            json_response = self._revalidate_response(url_response,
+                                                      last_refreshed, url)
+        except ThrottleError as err:
+            err.api_key = api_key
+            raise
+        except InvalidRequestError:
+            self._record_symbols(url, False)
+            raise
+        self._record_symbols(url, True)
+        self._cache_response(url, url_response)
+        return json_response
+
+    def _check_symbols(self, url):
+        """ Raise InvalidRequestError if the symbol directory of the instance
+        knows that a symbol of the call is invalid
+
+        Keyword Arguments:
+            url:  The url of the service
+        """
+        if self.symbol_directory is not None:
+            self.symbol_directory.check(self._request_key(url))
+
+    def _record_symbols(self, url, valid):
+        """ Tell the symbol directory of the instance, if any, whether the api
+        accepted the symbols of the call
+
+        Keyword Arguments:
+            url:  The url of the service
+            valid:  Whether the api accepted the call
+        """
+        if self.symbol_directory is not None:
+            self.symbol_directory.record(self._request_key(url), valid)
+
+    def _revalidate_response(self, url_response, last_refreshed=None,
+                             url=None):
+        """ Parse the body of an api response, unless its last refreshed time
+        is the given one: then the data did not change and a _NotModified is
+        returned without decoding the body.
+
+        Keyword Arguments:
+            url_response:  The body of the api response
+            last_refreshed:  The last refreshed time of the output being
+                revalidated (default None)
+            url:  The url of the call, giving the schema of its time series
+                (default None)
         """
+        if last_refreshed is not None:
+            # The meta data comes first, no need to look further
+            head = url_response[:4096]
+            if isinstance(head, bytes):
+                head = head.decode('utf-8', 'ignore')
+            match = self._LAST_REFRESHED.search(head)
+            if match is not None and match.group(1) == last_refreshed:
+                return _NotModified(url_response, url)
+        return self._parse_response(url_response, url)
+
+    def _cached_response(self, url, last_refreshed=None):
+        """ Return the parsed response of the call from the cache of the
+        instance, or None if it has no fresh one.
+
+        Keyword Arguments:
+            url:  The url of the service
+            last_refreshed:  The last refreshed time of the output being
+                revalidated (default None)
+        """
+        if self.cache is None:
+            return None
+        url_response = self.cache.get(self._request_key(url))
+        if url_response is None:
+            return None
+        return self._revalidate_response(url_response, last_refreshed, url)
+
+    def _cache_response(self, url, url_response):
+        """ Store the body of a successful response in the cache of the
+        instance, if any.
+
+        Keyword Arguments:
+            url:  The url of the service
+            url_response:  The body of the api response
+        """
+        if self.cache is not None:
+            self.cache.set(self._request_key(url), url_response)
+
+    def _fetch(self, url, timeout=None, parser=None, abandoned=None):
+        """ Return the body of the api response, decompressing it
+        incrementally while it is read. When a parser is given, the body is
+        given to it while it is received and the parser is returned instead.
+
+        Keyword Arguments:
+            url:  The url of the service
+            timeout:  Seconds to wait for the response, None to use the
+                default of the transport (default None)
+            parser:  The parser class (SeriesParser or CsvParser) the body
+                is streamed to, None to return the body (default None)
+            abandoned:  threading.Event set when the response is not needed
+                anymore, the body then stops being read and None is returned
+                (default None)
+        """
+        # Large responses are highly compressible json
+        headers = {'Accept-Encoding': ACCEPT_ENCODING}
+        if self.transport is not None:
+            response = self.transport.urlopen(url, headers=headers,
+                                              timeout=timeout)
         # In order to keep supporting python 2.7, we have to do this.
-        if sys.version_info.major == 3:
-            response = urllib.request.urlopen(url)
+        elif sys.version_info.major == 3:
+            request = urllib.request.Request(url, headers=headers)
+            if timeout is None:
+                response = urllib.request.urlopen(request)
+            else:
+                response = urllib.request.urlopen(request, timeout=timeout)
         else:
             response = urllib.urlopen(url)
-        url_response = response.read()
-        if 'json' in self.output_format.lower() or 'pandas' in \
-                self.output_format.lower():
-            json_response = loads(url_response)
+        try:
+            decoded = DecodedResponse(response, self.transfer_stats)
+            if parser is None and abandoned is None:
+                return decoded.read()
+            if parser is not None:
+                parser = self._new_parser(parser, url)
+            chunks = []
+            chunk = decoded.read(65536)
+            while chunk:
+                if abandoned is not None and abandoned.is_set():
+                    return None
+                if parser is not None:
+                    parser.feed(chunk)
+                else:
+                    chunks.append(chunk)
+                chunk = decoded.read(65536)
+            if parser is not None:
+                return parser
+            return chunks[0][:0].join(chunks) if chunks else b''
+        finally:
+            response.close()
+
+    def _fetch_hedged(self, url, timeout=None, parser=None):
+        """ Fetch the api response, sending the call a second time if no
+        response arrived after hedge_after seconds and the budget allows it.
+        The first successful response wins, the slower call stops reading
+        its response and closes it.
+
+        Keyword Arguments:
+            url:  The url of the service
+            timeout:  Seconds to wait for the response, None to use the read
+                timeout of the transport, or _HEDGE_TIMEOUT if it has none
+                (default None)
+            parser:  The parser class the body is streamed to, None to
+                return the body (default None)
+        """
+        if timeout is None:
+            # The abandoned call must not hold its thread forever
+            timeout = getattr(self.transport, 'read_timeout', None) or \
+                _HEDGE_TIMEOUT
+        executor = _hedge_executor()
+        abandoned = threading.Event()
+        start = time.time()
+        calls = [executor.submit(self._fetch, url, timeout, parser,
+                                 abandoned)]
+        try:
+            done, _ = futures.wait(calls, timeout=self.hedge_after)
+            if not done:
+                hedge_url = self._reserve_hedge(url)
+                if hedge_url is not None:
+                    calls.append(executor.submit(
+                        self._fetch, hedge_url,
+                        timeout - (time.time() - start), parser, abandoned))
+            error = None
+            for call in futures.as_completed(calls):
+                try:
+                    return call.result()
+                except Exception as err:
+                    error = err
+            raise error
+        finally:
+            abandoned.set()
+            for call in calls:
+                call.cancel()
+
+    def _reserve_hedge(self, url):
+        """ Return the url for a duplicate of the call if the rate limiter
+        and the key pool of the instance have budget left right away, else
+        None.
+
+        Keyword Arguments:
+            url:  The url of the service
+        """
+        if self.rate_limiter is not None and self.rate_limiter.reserve() > 0:
+            return None
+        if self.key_pool is not None:
+            api_key, _ = self.key_pool.reserve()
+            if api_key is None:
+                if self.rate_limiter is not None:
+                    # The duplicate is not sent
+                    self.rate_limiter.release()
+                return None
+            url = self._with_api_key(url, api_key)
+        return url
+
+    def _stream_parser(self, last_refreshed=None):
+        """ Return the parser class the body of the calls is given to while
+        it is received, or None. The body is only streamed when it is parsed
+        into columns and it is not needed afterwards, by the cache or the
+        revalidation.
+
+        Keyword Arguments:
+            last_refreshed:  The last refreshed time of the output being
+                revalidated (default None)
+        """
+        if self.cache is not None or last_refreshed is not None:
+            return None
+        return self._series_parser()
+
+    def _series_parser(self):
+        """ Return the parser class of the responses when their time series
+        are parsed straight into columns, for the pandas and numpy outputs:
+        the CsvParser for the csv data type, else the SeriesParser. It
+        returns None otherwise. The history store merges the json responses,
+        so they are kept as they are when it is used.
+        """
+        if not _NUMPY_FOUND or \
+                self.output_format.lower() not in ('pandas', 'numpy'):
+            return None
+        if self.datatype == 'csv':
+            return CsvParser
+        if self.history_store is None:
+            return SeriesParser
+        return None
+
+    def _new_parser(self, parser, url):
+        """ Return a parser of the given class for the body of a call
+
+        Keyword Arguments:
+            parser:  The parser class, SeriesParser or CsvParser
+            url:  The url of the call, giving the schema of its time series
+        """
+        if parser is SeriesParser:
+            return SeriesParser(schema=schema_for(url), loads=self.json_loads)
+        return parser(schema=schema_for(url))
+
+    def _parse_response(self, url_response, url=None):
+        """ Parse the body of an api response into a json object, or into
+        CsvRows for the csv output. For the pandas and numpy outputs the time
+        series are parsed into SeriesColumns instead. It raises a ValueError
+        when the api answered with an error
+
+        Keyword Arguments:
+            url_response:  The body of the api response, or the parser it was
+                streamed to
+            url:  The url of the call, giving the schema of its time series
+                (default None)
+        """
+        json_response = None
+        if isinstance(url_response, (SeriesParser, CsvParser)):
+            json_response = url_response.close()
+            # Without a time series the parser kept the whole body
+            url_response = url_response.text
+        elif self._series_parser() is SeriesParser:
+            json_response = parse_series(url_response, schema_for(url or ''),
+                                         self.json_loads)
+        elif self._series_parser() is CsvParser:
+            json_response = parse_csv(url_response,
+                                      schema=schema_for(url or ''))
+        elif self.output_format.lower() == 'csv' and \
+                url_response.lstrip()[:1] not in (b'{', u'{'):
+            # The errors of the api are json even for csv calls
+            if not url_response.strip():
+                raise EmptyResponseError(
+                    'Error getting data from the api, no return was given.')
+            return CsvRows(url_response)
+        if isinstance(json_response, SeriesColumns):
+            # Parsed from a csv response
             if not json_response:
-                raise ValueError(
+                raise EmptyResponseError(
                     'Error getting data from the api, no return was given.')
-            elif "Error Message" in json_response:
-                raise ValueError(json_response["Error Message"])
-            elif "Information" in json_response and self.treat_info_as_error:
-                raise ValueError(json_response["Information"])
             return json_response
-        else:
-            csv_response = csv.reader(url_response)
-            if not csv_response:
-                raise ValueError(
-                    'Error getting data from the api, no return was given.')
-            return csv_response
+        if json_response is None:
+            json_response = self.json_loads(url_response)
+        if not json_response:
+            raise EmptyResponseError(
+                'Error getting data from the api, no return was given.')
+        elif "Error Message" in json_response:
+            raise InvalidRequestError(json_response["Error Message"])
+        elif "Note" in json_response:
+            raise ThrottleError(json_response["Note"])
+        elif "Information" in json_response:
+            # A throttled call has no data, even when information is not
+            # treated as an error
+            if self._THROTTLE_MESSAGE.search(json_response["Information"]):
+                raise ThrottleError(json_response["Information"])
+            elif self.treat_info_as_error:
+                raise InformationError(json_response["Information"])
+        return json_response
@@ -0,0 +1,297 @@
+import asyncio
+import time
+from urllib.error import HTTPError
+# aiohttp is an optional dependency, only needed by the asynchronous clients
+try:
+    import aiohttp
+    _AIOHTTP_FOUND = True
+except ImportError:
+    _AIOHTTP_FOUND = False
+from ..alphavantage import AlphaVantage
+from ..errors import InvalidRequestError, ThrottleError
+from ..history import merge_history
+from ..transfer import ACCEPT_ENCODING, ResponseDecoder, content_encoding
+
+
+class AsyncAlphaVantage(AlphaVantage):
+    """ Base class of the asynchronous clients. They are built on top of the
+    synchronous classes, so every decorated get_* method returns an awaitable
+    that resolves to the same output as its synchronous counterpart.
+    """
+
+    def __init__(self, *args, session=None, max_concurrency=10,
+                 connect_timeout=10, read_timeout=60, **kwargs):
+        """ Initialize the class, it accepts the same arguments as the
+        synchronous classes plus:
+
+        Keyword Arguments:
+            session:  aiohttp.ClientSession used for the api calls, give the
+                same session to several instances to share its connection
+                pool. If None, the instance creates its own on the first call
+                (default None)
+            max_concurrency:  Maximum amount of simultaneous connections of
+                the session created by the instance (default 10)
+            connect_timeout:  Seconds to wait for a connection to be
+                established by the session created by the instance
+                (default 10)
+            read_timeout:  Seconds to wait for the server to send data on the
+                session created by the instance (default 60)
+
+        The single_flight argument takes an AsyncSingleFlight.
+        """
+        if not _AIOHTTP_FOUND:
+            raise ValueError("The aiohttp library was not found, therefore "
+                             "the asynchronous clients can not be used, "
+                             "please install manually")
+        super(AsyncAlphaVantage, self).__init__(*args, **kwargs)
+        self.session = session
+        self._owns_session = session is None
+        self.max_concurrency = max_concurrency
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+
+    async def close(self):
+        """ Close the session, if it was created by the instance
+        """
+        if self._owns_session and self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        await self.close()
+
+    def _get_session(self):
+        """ Return the session of the instance, creating it if needed. It
+        must be called from within a running event loop.
+        """
+        if self.session is None:
+            self.session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.max_concurrency),
+                timeout=aiohttp.ClientTimeout(
+                    sock_connect=self.connect_timeout,
+                    sock_read=self.read_timeout))
+        return self.session
+
+    def _on_response(self, call_response, callback, *args):
+        """ Await the response of the api call before giving it to the
+        callback that processes it.
+
+        Keyword Arguments:
+            call_response:  The awaitable returned by _handle_api_call
+            callback:  The function that processes the response
+            args:  Extra arguments for the callback
+        """
+        async def _resolve():
+            return callback(await call_response, *args)
+        return _resolve()
+
+    def _on_result(self, result):
+        """ Return an awaitable resolving to an output found in the result
+        cache.
+
+        Keyword Arguments:
+            result:  The output found in the cache
+        """
+        async def _resolve():
+            return result
+        return _resolve()
+
+    async def _sync_history(self, url, deadline=None):
+        """ Asynchronous version of AlphaVantage._sync_history
+
+        Keyword Arguments:
+            url:  The url of the full call
+            deadline:  The time by which the call must be done, None for no
+                limit (default None)
+        """
+        key = self._request_key(url)
+        history = self.history_store.get(key)
+        if history is not None:
+            update = await self._handle_api_call(
+                url.replace('outputsize=full', 'outputsize=compact'),
+                deadline=deadline)
+            history = merge_history(history, update, 'ADJUSTED' in key)
+        if history is None:
+            history = await self._handle_api_call(url, deadline=deadline)
+        self.history_store.set(key, history)
+        return history
+
+    async def _fetch_many(self, func, symbols, *args, **kwargs):
+        """ Asynchronous version of AlphaVantage._fetch_many, it awaits the
+        calls concurrently and yields (symbol, result, error) tuples as they
+        complete.
+
+        Keyword Arguments:
+            func:  The api call, it gets the symbol as its first argument
+            symbols:  The symbols to call the api for
+            max_workers:  Maximum amount of simultaneous calls (default
+                max_concurrency)
+            args, kwargs:  The other arguments of the api call
+        """
+        semaphore = asyncio.Semaphore(
+            kwargs.pop('max_workers', self.max_concurrency))
+
+        async def _fetch(symbol):
+            async with semaphore:
+                try:
+                    return symbol, await func(symbol, *args, **kwargs), None
+                except Exception as err:
+                    return symbol, None, err
+        for call in asyncio.as_completed([_fetch(symbol)
+                                          for symbol in symbols]):
+            yield await call
+
+    async def _acquire_rate_limiter(self, deadline=None):
+        """ Wait without blocking the event loop until the rate limiter of
+        the instance, if any, lets a call through. It returns the api key
+        chosen for the call when the instance has a key pool, else None. It
+        raises asyncio.TimeoutError right away when the wait would go past
+        the deadline.
+
+        Keyword Arguments:
+            deadline:  The time by which the call must be sent, None for no
+                limit (default None)
+        """
+        if self.rate_limiter is not None:
+            wait = self.rate_limiter.reserve()
+            while wait > 0:
+                self._check_wait(wait, deadline)
+                await asyncio.sleep(wait)
+                wait = self.rate_limiter.reserve()
+        if self.key_pool is None:
+            return None
+        api_key, wait = self.key_pool.reserve()
+        while api_key is None:
+            self._check_wait(wait, deadline)
+            await asyncio.sleep(wait)
+            api_key, wait = self.key_pool.reserve()
+        return api_key
+
+    @staticmethod
+    def _check_wait(wait, deadline):
+        """ Raise asyncio.TimeoutError if waiting for the budget of the
+        call would go past its deadline
+        """
+        if deadline is not None and time.time() + wait > deadline:
+            raise asyncio.TimeoutError('The rate limiter has no budget left '
+                                       'before the deadline of the call')
+
+    async def _fetch(self, url, parser=None):
+        """ Return the body of the api response, decompressing it
+        incrementally while it is received. When a parser is given, the body
+        is given to it while it is received and the parser is returned
+        instead. It raises HTTPError on http error status codes, like the
+        synchronous clients.
+
+        Keyword Arguments:
+            url:  The url of the service
+            parser:  The parser class (SeriesParser or CsvParser) the body
+                is streamed to, None to return the body (default None)
+        """
+        headers = {'Accept-Encoding': ACCEPT_ENCODING}
+        # Decompress here instead of in aiohttp to count the bytes received
+        async with self._get_session().get(
+                url, headers=headers, auto_decompress=False) as response:
+            if response.status >= 400:
+                # The retry policy tells the transient server errors by
+                # their status code
+                raise HTTPError(url, response.status, response.reason,
+                                response.headers, None)
+            decoder = ResponseDecoder(
+                content_encoding(response), self.transfer_stats)
+            if parser is not None:
+                parser = self._new_parser(parser, url)
+                async for chunk in response.content.iter_chunked(65536):
+                    parser.feed(decoder.decode(chunk))
+                parser.feed(decoder.flush())
+                return parser
+            chunks = []
+            async for chunk in response.content.iter_chunked(65536):
+                chunks.append(decoder.decode(chunk))
+            chunks.append(decoder.flush())
+        return b''.join(chunks)
+
+    async def _fetch_hedged(self, url, parser=None):
+        """ Asynchronous version of AlphaVantage._fetch_hedged
+
+        Keyword Arguments:
+            url:  The url of the service
+            parser:  The parser class the body is streamed to, None to
+                return the body (default None)
+        """
+        calls = [asyncio.ensure_future(self._fetch(url, parser))]
+        try:
+            done, _ = await asyncio.wait(calls, timeout=self.hedge_after)
+            if not done:
+                hedge_url = self._reserve_hedge(url)
+                if hedge_url is not None:
+                    calls.append(asyncio.ensure_future(
+                        self._fetch(hedge_url, parser)))
+            error = None
+            for call in asyncio.as_completed(calls):
+                try:
+                    return await call
+                except Exception as err:
+                    error = err
+            raise error
+        finally:
+            # The slower call is abandoned
+            for call in calls:
+                call.cancel()
+
+    async def _handle_api_call(self, url, deadline=None,
+                               last_refreshed=None):
+        """ Asynchronous version of AlphaVantage._handle_api_call, retrying
+        the call following the retry policy of the instance.
+
+        Keyword Arguments:
+            url:  The url of the service
+            deadline:  The time by which the call must be done, None for no
+                limit (default None)
+            last_refreshed:  The last refreshed time of the output being
+                revalidated (default None)
+        """
+        self._check_symbols(url)
+        cached_response = self._cached_response(url, last_refreshed)
+        if cached_response is not None:
+            return cached_response
+        start = time.time()
+        attempt = 0
+        while True:
+            try:
+                api_key = await self._acquire_rate_limiter(deadline)
+                if api_key is not None:
+                    url = self._with_api_key(url, api_key)
+                parser = self._stream_parser(last_refreshed)
+                if self.hedge_after is None:
+                    fetch = self._fetch(url, parser)
+                else:
+                    fetch = self._fetch_hedged(url, parser)
+                if deadline is not None:
+                    fetch = asyncio.wait_for(fetch, deadline - time.time())
+                url_response = await fetch
+                try:
+                    json_response = self._revalidate_response(
+                        url_response, last_refreshed, url)
+                except ThrottleError as err:
+                    err.api_key = api_key
+                    raise
+                except InvalidRequestError:
+                    self._record_symbols(url, False)
+                    raise
+                self._record_symbols(url, True)
+                self._cache_response(url, url_response)
+                return json_response
+            except Exception as err:
+                # aiohttp errors are network errors, always transient
+                delay = self._retry_delay(
+                    attempt, err, start,
+                    retryable=True if isinstance(err, aiohttp.ClientError)
+                    else None, deadline=deadline)
+                if delay is None:
+                    raise
+            await asyncio.sleep(delay)
+            attempt += 1
@@ -0,0 +1,7 @@
+from ..cryptocurrencies import CryptoCurrencies
+from .alphavantage import AsyncAlphaVantage
+
+
+class AsyncCryptoCurrencies(AsyncAlphaVantage, CryptoCurrencies):
+    """Awaitable versions of all the crypto currencies api calls
+    """
@@ -0,0 +1,7 @@
+from ..foreignexchange import ForeignExchange
+from .alphavantage import AsyncAlphaVantage
+
+
+class AsyncForeignExchange(AsyncAlphaVantage, ForeignExchange):
+    """Awaitable versions of the realtime currency exchange rates api calls
+    """
@@ -0,0 +1,7 @@
+from ..sectorperformance import SectorPerformances
+from .alphavantage import AsyncAlphaVantage
+
+
+class AsyncSectorPerformances(AsyncAlphaVantage, SectorPerformances):
+    """Awaitable versions of all the sector performance api calls
+    """
@@ -0,0 +1,31 @@
+import asyncio
+
+
+class AsyncSingleFlight(object):
+    """ Asynchronous version of SingleFlight: while an api call is in flight,
+    the tasks asking for the same request await it and share its parsed
+    result instead of sending it again. Give the same instance to several
+    asynchronous clients to coalesce their calls too.
+    """
+
+    def __init__(self):
+        self._calls = {}
+
+    async def do(self, key, func, *args):
+        """ Return await func(*args), or the result of the call with the same
+        key already in flight. The error of the call is raised to all its
+        callers.
+
+        Keyword Arguments:
+            key:  The normalized request of the call
+            func:  The coroutine function doing the call
+            args:  The arguments for func
+        """
+        call = self._calls.get(key)
+        if call is None:
+            call = asyncio.ensure_future(func(*args))
+            self._calls[key] = call
+            call.add_done_callback(lambda _: self._calls.pop(key, None))
+        # Shielded, so that a cancelled caller does not cancel the call for
+        # the other ones
+        return await asyncio.shield(call)
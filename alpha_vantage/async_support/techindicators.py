@@ -0,0 +1,7 @@
+from ..techindicators import TechIndicators
+from .alphavantage import AsyncAlphaVantage
+
+
+class AsyncTechIndicators(AsyncAlphaVantage, TechIndicators):
+    """Awaitable versions of all the technical indicator api calls
+    """
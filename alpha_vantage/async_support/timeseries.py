@@ -0,0 +1,7 @@
+from ..timeseries import TimeSeries
+from .alphavantage import AsyncAlphaVantage
+
+
+class AsyncTimeSeries(AsyncAlphaVantage, TimeSeries):
+    """Awaitable versions of all the times series api calls
+    """
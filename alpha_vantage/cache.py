@@ -0,0 +1,297 @@
+#!/usr/bin/env python
+import re
+import sqlite3
+import sys
+import threading
+import time
+from collections import OrderedDict
+from .lazy import LazyModule, module_loaded
+# Pandas became an optional dependency, the outputs can only hold data frames
+# or arrays once it (or numpy) was imported
+pandas = LazyModule('pandas')
+numpy = LazyModule('numpy')
+
+# Seconds the responses of each api function stay fresh. The intraday and
+# exchange rate data change every minute, while the weekly and monthly series
+# only get a new point at the end of the day.
+DEFAULT_TTLS = {
+    'TIME_SERIES_INTRADAY': 60,
+    'CURRENCY_EXCHANGE_RATE': 60,
+    'DIGITAL_CURRENCY_INTRADAY': 60,
+    'SECTOR': 300,
+    'TIME_SERIES_DAILY': 3600,
+    'TIME_SERIES_DAILY_ADJUSTED': 3600,
+    'DIGITAL_CURRENCY_DAILY': 3600,
+    'TIME_SERIES_WEEKLY': 6 * 3600,
+    'TIME_SERIES_WEEKLY_ADJUSTED': 6 * 3600,
+    'DIGITAL_CURRENCY_WEEKLY': 6 * 3600,
+    'TIME_SERIES_MONTHLY': 12 * 3600,
+    'TIME_SERIES_MONTHLY_ADJUSTED': 12 * 3600,
+    'DIGITAL_CURRENCY_MONTHLY': 12 * 3600,
+}
+
+_FUNCTION_PARAMETER = re.compile(r'[?&]function=([^&]*)')
+
+
+class _ExpiringCache(object):
+    """ Base class of the caches, whose entries expire after the ttl of
+    their api function.
+    """
+
+    def __init__(self, ttls=None, default_ttl=300):
+        self.ttls = dict(DEFAULT_TTLS)
+        if ttls is not None:
+            self.ttls.update(ttls)
+        self.default_ttl = default_ttl
+
+    def ttl(self, key):
+        """ Return the seconds the response of a call stays fresh
+
+        Keyword Arguments:
+            key:  The url of the call without its api key
+        """
+        match = _FUNCTION_PARAMETER.search(key)
+        function = match.group(1).upper() if match else None
+        return self.ttls.get(function, self.default_ttl)
+
+
+class DiskCache(_ExpiringCache):
+    """ Persistent cache of the api responses in a SQLite database file,
+    keyed by the url of the call without its api key. Give the same cache to
+    several instances, or use the same file from several processes, so that
+    the same series is downloaded once until it expires.
+    """
+
+    def __init__(self, path, ttls=None, default_ttl=300, timeout=30):
+        """ Initialize the cache, creating the database if needed
+
+        Keyword Arguments:
+            path:  Path of the database file
+            ttls:  Dictionary of api function (like 'TIME_SERIES_DAILY') to
+                the seconds its responses stay fresh, updating DEFAULT_TTLS.
+                A ttl of 0 disables the cache for that function (default None)
+            default_ttl:  Seconds the responses of the functions without a
+                ttl stay fresh, like the technical indicators (default 300)
+            timeout:  Seconds to wait for the lock of the database (default 30)
+        """
+        super(DiskCache, self).__init__(ttls, default_ttl)
+        self.path = path
+        self.timeout = timeout
+        connection = self._connect()
+        try:
+            connection.execute('CREATE TABLE IF NOT EXISTS responses '
+                               '(key TEXT PRIMARY KEY, stored REAL, '
+                               'body BLOB)')
+        finally:
+            connection.close()
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=self.timeout,
+                               isolation_level=None)
+
+    def get(self, key):
+        """ Return the body of the cached response of a call, or None if it
+        is not cached or expired.
+
+        Keyword Arguments:
+            key:  The url of the call without its api key
+        """
+        ttl = self.ttl(key)
+        if not ttl:
+            return None
+        connection = self._connect()
+        try:
+            row = connection.execute('SELECT body FROM responses WHERE '
+                                     'key = ? AND stored > ?',
+                                     (key, time.time() - ttl)).fetchone()
+        finally:
+            connection.close()
+        return bytes(row[0]) if row is not None else None
+
+    def set(self, key, body):
+        """ Store the body of the response of a call
+
+        Keyword Arguments:
+            key:  The url of the call without its api key
+            body:  The body of the response
+        """
+        if not self.ttl(key):
+            return
+        if not isinstance(body, bytes):
+            body = body.encode('utf-8')
+        connection = self._connect()
+        try:
+            connection.execute('INSERT OR REPLACE INTO responses '
+                               '(key, stored, body) VALUES (?, ?, ?)',
+                               (key, time.time(), sqlite3.Binary(body)))
+        finally:
+            connection.close()
+
+    def clear(self):
+        """ Remove all the cached responses
+        """
+        connection = self._connect()
+        try:
+            connection.execute('DELETE FROM responses')
+        finally:
+            connection.close()
+
+
+class ResultCache(_ExpiringCache):
+    """ Thread safe in memory LRU cache of the formatted outputs of the api
+    calls, the (data, meta_data) tuples and data frames. It is bounded by the
+    approximate amount of bytes of its entries, the least recently used ones
+    are evicted first. Every output is copied when it is read, so that the
+    callers can modify it without corrupting the cache.
+    """
+
+    def __init__(self, max_bytes=64 * 1024 * 1024, ttls=None,
+                 default_ttl=300):
+        """ Initialize the cache
+
+        Keyword Arguments:
+            max_bytes:  Maximum amount of bytes of all the entries, larger
+                outputs are not cached (default 64 MiB)
+            ttls:  Dictionary of api function to the seconds its outputs
+                stay fresh, updating DEFAULT_TTLS (default None)
+            default_ttl:  Seconds the outputs of the functions without a ttl
+                stay fresh (default 300)
+        """
+        super(ResultCache, self).__init__(ttls, default_ttl)
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.revalidations = 0
+        # Key to (output, size, expiry time), least recently used first
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def stats(self):
+        """ Return a dictionary with the hits, misses, evictions,
+        revalidations, entries and bytes of the cache
+        """
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses,
+                    'evictions': self.evictions,
+                    'revalidations': self.revalidations,
+                    'entries': len(self._entries), 'bytes': self.size}
+
+    def get(self, key):
+        """ Return a copy of the cached output of a call, or None if it is
+        not cached or expired.
+
+        Keyword Arguments:
+            key:  Tuple starting with the url of the call without its api key
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[2] <= time.time():
+                # Expired outputs are kept until they are evicted, so that
+                # they can be revalidated
+                self.misses += 1
+                return None
+            # Most recently used
+            self._entries[key] = self._entries.pop(key)
+            self.hits += 1
+        return _copy(entry[0])
+
+    def get_stale_meta_data(self, key):
+        """ Return the meta data of the cached (data, meta data) output of a
+        call even if it expired, or None if it is not cached. It does not
+        count as a hit or a miss. The meta data is not copied, it must not be
+        modified.
+
+        Keyword Arguments:
+            key:  Tuple starting with the url of the call without its api key
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry is None or not isinstance(entry[0], tuple) or \
+                len(entry[0]) != 2:
+            return None
+        return entry[0][1]
+
+    def revalidate(self, key):
+        """ Make an expired output fresh again, after the api told that it
+        did not change. It returns a copy of the output, or None if it is not
+        cached anymore.
+
+        Keyword Arguments:
+            key:  Tuple starting with the url of the call without its api key
+        """
+        with self._lock:
+            entry = self._entries.pop(key, None)
+            if entry is None:
+                return None
+            output, size, _ = entry
+            self._entries[key] = (output, size, time.time() + self.ttl(key[0]))
+            self.revalidations += 1
+        return _copy(output)
+
+    def set(self, key, output):
+        """ Store the output of a call, evicting the least recently used
+        outputs to make room for it. It returns a copy of the output for the
+        caller.
+
+        Keyword Arguments:
+            key:  Tuple starting with the url of the call without its api key
+            output:  The formatted output of the call
+        """
+        ttl = self.ttl(key[0])
+        size = _size_of(output)
+        if not ttl or size > self.max_bytes:
+            return output
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.size -= previous[1]
+            while self._entries and self.size + size > self.max_bytes:
+                _, (_, evicted_size, _) = self._entries.popitem(last=False)
+                self.size -= evicted_size
+                self.evictions += 1
+            self._entries[key] = (output, size, time.time() + ttl)
+            self.size += size
+        return _copy(output)
+
+    def clear(self):
+        """ Remove all the cached outputs
+        """
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+
+def _copy(output):
+    """ Return a copy of an output that shares nothing mutable with it. The
+    outputs are tuples, dictionaries and lists of immutable values, data
+    frames or arrays, which is much faster to copy than a generic deep copy.
+    """
+    if isinstance(output, dict):
+        # Keeps the ordered dictionaries of the numpy output ordered
+        return type(output)((key, _copy(value))
+                            for key, value in output.items())
+    elif isinstance(output, (list, tuple)):
+        return type(output)(_copy(value) for value in output)
+    elif module_loaded('pandas') and isinstance(output, pandas.DataFrame):
+        return output.copy(deep=True)
+    elif module_loaded('numpy') and isinstance(output, numpy.ndarray):
+        return output.copy()
+    return output
+
+
+def _size_of(output):
+    """ Return the approximate amount of bytes of an output
+    """
+    if isinstance(output, dict):
+        return sys.getsizeof(output) + sum(
+            _size_of(key) + _size_of(value) for key, value in output.items())
+    elif isinstance(output, (list, tuple)):
+        return sys.getsizeof(output) + sum(_size_of(value)
+                                           for value in output)
+    elif module_loaded('pandas') and isinstance(output, pandas.DataFrame):
+        return int(output.memory_usage(index=True, deep=True).sum())
+    elif module_loaded('numpy') and isinstance(output, numpy.ndarray):
+        return sys.getsizeof(output) + output.nbytes
+    return sys.getsizeof(output)
@@ -0,0 +1,175 @@
+#!/usr/bin/env python
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+import time
+from .cache import _ExpiringCache
+from .lazy import LazyModule, module_found
+from .schemas import schema_for
+# Pandas became an optional dependency, but we still want to track it. It is
+# only imported once a data frame is stored or read
+numpy = LazyModule('numpy')
+pandas = LazyModule('pandas')
+_PANDAS_FOUND = module_found('pandas')
+# The version of the layout of the stored directories, the ones stored with
+# another version are not read
+_FORMAT = 1
+_INT64_MAX = 2 ** 63 - 1
+
+
+def _integer_columns(key):
+    """ Return the names of the columns holding integers according to the
+    schema of a call, like the volumes of the stocks
+    """
+    schema = schema_for(key)
+    if schema is None:
+        return set()
+    return set(name for column, normalized, dtype
+               in zip(schema.columns, schema.names, schema.dtypes)
+               if numpy.dtype(dtype).kind in 'iu'
+               for name in (column, normalized))
+
+
+def _stored_array(array, integer):
+    """ Return a column as it is stored: int64 for a float column holding
+    integers according to its schema when all its values are whole numbers,
+    else as it is
+    """
+    if integer and array.dtype == numpy.float64 and len(array) and \
+            numpy.isfinite(array).all() and \
+            (array == numpy.trunc(array)).all() and \
+            abs(array).max() <= _INT64_MAX:
+        array = array.astype(numpy.int64)
+    return numpy.ascontiguousarray(array)
+
+
+class ColumnStore(_ExpiringCache):
+    """ Local store of the time series data frames as columnar numpy files,
+    one directory per call with a datetime64 index (in UTC, with the time
+    zone of the series kept aside) and a file per column. The columns holding
+    integers according to their schema, like the volumes, are stored as
+    int64 and read back in the dtype of the data frame that was stored.
+    The files are memory mapped when they are read, so loading a stored
+    series costs no json parsing and its pages are only read from disk when
+    they are used. Several processes can share the same directory.
+    """
+
+    def __init__(self, path, ttls=None, default_ttl=300):
+        """ Initialize the store, creating its directory if needed
+
+        Keyword Arguments:
+            path:  Path of the directory of the store
+            ttls:  Dictionary of api function to the seconds its series stay
+                fresh, updating DEFAULT_TTLS of alpha_vantage.cache (default
+                None)
+            default_ttl:  Seconds the series of the functions without a ttl
+                stay fresh (default 300)
+        """
+        if not _PANDAS_FOUND:
+            raise ValueError("The pandas library was not found, therefore "
+                             "the column store can not be used, please "
+                             "install manually")
+        super(ColumnStore, self).__init__(ttls, default_ttl)
+        self.path = path
+        if not os.path.isdir(path):
+            os.makedirs(path)
+
+    def _directory(self, key):
+        return os.path.join(
+            self.path, hashlib.sha1(key.encode('utf-8')).hexdigest())
+
+    def get(self, key):
+        """ Return the stored (data frame, meta data) of a call, or None if
+        it is not stored or expired. The columns are memory mapped.
+
+        Keyword Arguments:
+            key:  The url of the call without its api key
+        """
+        directory = self._directory(key)
+        try:
+            with open(os.path.join(directory, 'meta.json')) as meta_file:
+                meta = json.load(meta_file)
+            if meta.get('format') != _FORMAT or \
+                    meta['stored'] + self.ttl(key) <= time.time():
+                # Stored by another version, or expired
+                return None
+            index = numpy.load(os.path.join(directory, 'index.npy'),
+                               mmap_mode='r')
+            columns = [numpy.load(os.path.join(directory, '{}.npy'.format(i)),
+                                  mmap_mode='r')
+                       for i in range(len(meta['columns']))]
+        except (IOError, OSError, ValueError):
+            # Not stored, or replaced while it was read
+            return None
+        # Only the columns stored as integers are copied
+        columns = [column if column.dtype == dtype else column.astype(dtype)
+                   for column, dtype in zip(columns, meta['dtypes'])]
+        index = pandas.DatetimeIndex(index)
+        if meta['time_zone'] is not None:
+            index = index.tz_localize('UTC').tz_convert(meta['time_zone'])
+        # Not copied, the data frame keeps reading the (read only) mapped
+        # files
+        data_pandas = pandas.DataFrame(
+            dict(zip(meta['columns'], columns)), columns=meta['columns'],
+            index=index, copy=False)
+        data_pandas.index.name = meta['index_name']
+        return data_pandas, meta['meta_data']
+
+    def set(self, key, data_pandas, meta_data):
+        """ Store the data frame of a call. It returns False if the data frame
+        is not indexed by dates, or if it could not replace the stored one
+        (the store is only a cache).
+
+        Keyword Arguments:
+            key:  The url of the call without its api key
+            data_pandas:  The data frame indexed by date
+            meta_data:  The meta data of the call
+        """
+        index = data_pandas.index
+        if not self.ttl(key) or not len(index) or \
+                not isinstance(index, pandas.DatetimeIndex):
+            return False
+        time_zone = str(index.tz) if index.tz is not None else None
+        # Written aside and renamed, so that readers never see half a series
+        directory = self._directory(key)
+        new_directory = tempfile.mkdtemp(dir=self.path)
+        integers = _integer_columns(key)
+        try:
+            # The values of an index with a time zone are in UTC
+            numpy.save(os.path.join(new_directory, 'index.npy'),
+                       index.values.astype('datetime64[ns]'))
+            for i, column in enumerate(data_pandas.columns):
+                numpy.save(os.path.join(new_directory, '{}.npy'.format(i)),
+                           _stored_array(data_pandas.iloc[:, i].values,
+                                         column in integers))
+            with open(os.path.join(new_directory, 'meta.json'), 'w') as meta:
+                json.dump({'format': _FORMAT, 'key': key,
+                           'stored': time.time(),
+                           'columns': [str(column) for column in
+                                       data_pandas.columns],
+                           'dtypes': [str(dtype) for dtype in
+                                      data_pandas.dtypes],
+                           'index_name': data_pandas.index.name,
+                           'time_zone': time_zone,
+                           'meta_data': meta_data}, meta)
+        except Exception:
+            shutil.rmtree(new_directory, ignore_errors=True)
+            raise
+        old_directory = None
+        try:
+            if os.path.isdir(directory):
+                old_directory = tempfile.mkdtemp(dir=self.path)
+                os.rename(directory, os.path.join(old_directory, 'old'))
+            os.rename(new_directory, directory)
+        except OSError:
+            # Another process stored or removed the same call meanwhile
+            shutil.rmtree(new_directory, ignore_errors=True)
+            if old_directory is not None:
+                shutil.rmtree(old_directory, ignore_errors=True)
+            return False
+        if old_directory is not None:
+            # Memory mapped files stay readable after they are removed
+            shutil.rmtree(old_directory, ignore_errors=True)
+        return True
@@ -0,0 +1,134 @@
+#!/usr/bin/env python
+from collections import OrderedDict
+from .lazy import LazyModule
+from .schemas import SCHEMAS
+# Only imported once a compact output is built
+numpy = LazyModule('numpy')
+pandas = LazyModule('pandas')
+
+# The compact modes of the pandas and numpy outputs: None keeps every column
+# float64, 'lossless' stores the integer columns (the volumes) as integers
+# and 'float32' also stores the other columns, like the prices, as float32
+COMPACT_MODES = (None, 'lossless', 'float32')
+_UINT32_MAX = 2 ** 32 - 1
+_INT64_MAX = 2 ** 63 - 1
+
+
+def _integer_columns():
+    """ The names, as in the json responses and normalized, of the columns
+    holding integers according to the schemas
+    """
+    columns = set()
+    for schema in SCHEMAS.values():
+        for column, name, dtype in zip(schema.columns, schema.names,
+                                       schema.dtypes):
+            if numpy.dtype(dtype).kind in 'iu':
+                columns.add(column)
+                columns.add(name)
+    return columns
+
+
+def compact_array(array, mode, integer=False):
+    """ Return a float64 column in its compact dtype: uint32 for an integer
+    column whose values fit in it, else int64, and float32 for the other
+    columns with the 'float32' mode. A column is only stored as integers when
+    all its values are whole numbers, the volumes of the cryptocurrencies
+    being fractional. Other arrays are returned as they are.
+
+    Keyword Arguments:
+        array:  The array of the column
+        mode:  The compact mode, one of COMPACT_MODES
+        integer:  Whether the column holds integers according to its schema
+            (default False)
+    """
+    if mode is None or array.dtype != numpy.float64:
+        return array
+    if integer and len(array) and numpy.isfinite(array).all() and \
+            (array == numpy.trunc(array)).all():
+        if array.min() >= 0 and array.max() <= _UINT32_MAX:
+            return array.astype(numpy.uint32)
+        if abs(array).max() <= _INT64_MAX:
+            return array.astype(numpy.int64)
+    if mode == 'float32':
+        return array.astype(numpy.float32)
+    return array
+
+
+def compact_frame(data_pandas, mode):
+    """ Return the data frame of a call with its columns in their compact
+    dtypes, see compact_array
+
+    Keyword Arguments:
+        data_pandas:  The data frame, with float64 columns
+        mode:  The compact mode, one of COMPACT_MODES
+    """
+    if mode is None:
+        return data_pandas
+    integers = _integer_columns()
+    columns = [compact_array(data_pandas.iloc[:, i].values, mode,
+                             column in integers)
+               for i, column in enumerate(data_pandas.columns)]
+    compacted = pandas.DataFrame(OrderedDict(enumerate(columns)),
+                                 index=data_pandas.index)
+    compacted.columns = data_pandas.columns
+    return compacted
+
+
+def compact_arrays(arrays, mode):
+    """ Return the numpy output of a call with its columns in their compact
+    dtypes, see compact_array
+
+    Keyword Arguments:
+        arrays:  The ordered dictionary of the arrays by column
+        mode:  The compact mode, one of COMPACT_MODES
+    """
+    if mode is None:
+        return arrays
+    integers = _integer_columns()
+    return OrderedDict((column, compact_array(array, mode,
+                                              column in integers))
+                       for column, array in arrays.items())
+
+
+def concat_symbols(frames):
+    """ Return the data frames of several symbols as one data frame, the
+    symbol of every row in a categorical 'symbol' column, which takes a byte
+    or two per row instead of a string. The frames keep their dtypes.
+
+    Keyword Arguments:
+        frames:  Dictionary (or pairs) of the data frames by symbol, like
+            the results of a _many call
+    """
+    frames = OrderedDict(frames)
+    data_pandas = pandas.concat(list(frames.values()))
+    codes = numpy.repeat(numpy.arange(len(frames)),
+                         [len(frame) for frame in frames.values()])
+    data_pandas['symbol'] = pandas.Categorical.from_codes(
+        codes, categories=list(frames))
+    return data_pandas
+
+
+def memory_usage(data):
+    """ Return the bytes held by the pandas or numpy output of a call,
+    including the index of a data frame and its strings
+
+    Keyword Arguments:
+        data:  The data frame, or the dictionary of arrays
+    """
+    if isinstance(data, pandas.DataFrame):
+        return int(data.memory_usage(index=True, deep=True).sum())
+    return sum(array.nbytes for array in data.values())
+
+
+def memory_by_mode(data):
+    """ Return the bytes the pandas or numpy output of a call would hold in
+    every compact mode, by mode
+
+    Keyword Arguments:
+        data:  The data frame, or the dictionary of arrays, with float64
+            columns
+    """
+    compact = compact_frame if isinstance(data, pandas.DataFrame) \
+        else compact_arrays
+    return OrderedDict((mode, memory_usage(compact(data, mode)))
+                       for mode in COMPACT_MODES)
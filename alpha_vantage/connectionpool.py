@@ -0,0 +1,189 @@
+#!/usr/bin/env python
+import socket
+import threading
+# In order to keep supporting python 2.7, we have to do this.
+try:
+    from http.client import HTTPConnection, HTTPSConnection, HTTPException
+    from urllib.parse import urlsplit
+    from urllib.error import HTTPError
+except ImportError:
+    from httplib import HTTPConnection, HTTPSConnection, HTTPException
+    from urlparse import urlsplit
+    from urllib2 import HTTPError
+
+
+class ConnectionPool(object):
+    """ Thread safe pool of persistent (keep-alive) http connections. A
+    single pool can be given as the transport of any number of TimeSeries,
+    TechIndicators, CryptoCurrencies, ForeignExchange and SectorPerformances
+    instances, so that they all reuse the same open sockets instead of paying
+    the TCP (and TLS) set up on every call.
+    """
+
+    def __init__(self, maxsize=10, connect_timeout=10, read_timeout=60):
+        """ Initialize the pool
+
+        Keyword Arguments:
+            maxsize:  Maximum amount of idle connections kept open per host
+                (default 10)
+            connect_timeout:  Seconds to wait for a connection to be
+                established, None waits forever (default 10)
+            read_timeout:  Seconds to wait for the server to send data once
+                connected, None waits forever (default 60)
+        """
+        self.maxsize = maxsize
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self._idle = {}
+        self._lock = threading.Lock()
+
+    def urlopen(self, url, headers=None, timeout=None):
+        """ Do a GET request on the given url using a pooled connection and
+        return a file like response. The connection goes back to the pool
+        once the response has been completely read. It raises HTTPError on
+        http error status codes.
+
+        Keyword Arguments:
+            url:  The url of the service
+            headers:  Dictionary with extra request headers (default None)
+            timeout:  Maximum amount of seconds for this request, lowering
+                the connect and read timeouts of the pool (default None)
+        """
+        scheme, netloc, path, query, _ = urlsplit(url)
+        target = '{}?{}'.format(path, query) if query else path
+        host = (scheme, netloc)
+        # A reused connection may have been closed by the server while it was
+        # idle, in that case the request is sent again on a new connection.
+        while True:
+            connection, reused = self._get_connection(host, timeout)
+            try:
+                connection.request('GET', target, headers=headers or {})
+                response = connection.getresponse()
+            except (HTTPException, socket.error) as err:
+                connection.close()
+                if reused and not isinstance(err, socket.timeout):
+                    continue
+                raise
+            break
+        pooled_response = _PooledResponse(self, host, connection, response)
+        if response.status >= 400:
+            body = pooled_response.read()
+            raise HTTPError(url, response.status, body, response.msg, None)
+        return pooled_response
+
+    def close(self):
+        """ Close all the idle connections of the pool
+        """
+        with self._lock:
+            idle, self._idle = self._idle, {}
+        for connections in idle.values():
+            for connection in connections:
+                connection.close()
+
+    def _get_connection(self, host, timeout=None):
+        """ Return an idle connection for the host or open a new one, together
+        with a flag telling if the connection was reused.
+
+        Keyword Arguments:
+            host:  Tuple with the scheme and the network location
+            timeout:  Maximum amount of seconds for the request, None to use
+                the timeouts of the pool (default None)
+        """
+        with self._lock:
+            connections = self._idle.get(host)
+            connection = connections.pop() if connections else None
+        reused = connection is not None
+        if not reused:
+            scheme, netloc = host
+            connect_timeout = _shortest(self.connect_timeout, timeout)
+            if scheme == 'https':
+                connection = HTTPSConnection(netloc, timeout=connect_timeout)
+            else:
+                connection = HTTPConnection(netloc, timeout=connect_timeout)
+            connection.connect()
+        # The connect timeout was used for the handshake, from here on the
+        # socket waits at most the read timeout for the server.
+        connection.sock.settimeout(_shortest(self.read_timeout, timeout))
+        return connection, reused
+
+    def _put_connection(self, host, connection):
+        """ Give a connection back to the pool, closing it if the pool for
+        that host is already full.
+
+        Keyword Arguments:
+            host:  Tuple with the scheme and the network location
+            connection:  The connection to give back
+        """
+        with self._lock:
+            connections = self._idle.setdefault(host, [])
+            if len(connections) < self.maxsize:
+                connections.append(connection)
+                return
+        connection.close()
+
+
+def _shortest(*timeouts):
+    """ Return the shortest of the timeouts, None meaning no timeout
+    """
+    timeouts = [timeout for timeout in timeouts if timeout is not None]
+    return min(timeouts) if timeouts else None
+
+
+class _PooledResponse(object):
+    """ File like wrapper around an http response that gives its connection
+    back to the pool once the body has been completely read.
+    """
+
+    def __init__(self, pool, host, connection, response):
+        self._pool = pool
+        self._host = host
+        self._connection = connection
+        self._response = response
+        self.status = response.status
+
+    def info(self):
+        """ Return the headers of the response
+        """
+        return self._response.msg
+
+    def read(self, amt=None):
+        """ Read the body of the response, or at most amt bytes of it.
+
+        Keyword Arguments:
+            amt:  Maximum amount of bytes to read, None reads everything
+        """
+        try:
+            if amt is None:
+                data = self._response.read()
+            else:
+                data = self._response.read(amt)
+        except Exception:
+            self.close()
+            raise
+        if amt is None or not data:
+            self._release()
+        return data
+
+    def close(self):
+        """ Close the response, discarding the connection if its body was
+        not completely read.
+        """
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+        self._response.close()
+
+    def _release(self):
+        if self._connection is None:
+            return
+        connection, self._connection = self._connection, None
+        if self._response.will_close:
+            connection.close()
+        else:
+            self._pool._put_connection(self._host, connection)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
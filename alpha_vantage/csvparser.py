@@ -0,0 +1,179 @@
+#!/usr/bin/env python
+import codecs
+import csv
+from .lazy import LazyModule, module_found
+from .schemas import normalize_name
+from .seriesparser import SeriesColumns, _ColumnBuffers
+# Numpy comes with pandas, it is only needed for the pandas and numpy output
+# formats and only imported once they are built
+numpy = LazyModule('numpy')
+_NUMPY_FOUND = module_found('numpy')
+
+
+def _lines(body, chunk_size=65536):
+    """ Yield the lines of a csv body, decoding it chunk by chunk
+
+    Keyword Arguments:
+        body:  The body (bytes or text) of the api response
+        chunk_size:  Amount of the body decoded at once (default 65536)
+    """
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    pending = ''
+    for start in range(0, len(body), chunk_size):
+        chunk = body[start:start + chunk_size]
+        if isinstance(chunk, bytes):
+            chunk = decoder.decode(chunk)
+        lines = (pending + chunk).split('\n')
+        pending = lines.pop()
+        for line in lines:
+            yield line
+    pending += decoder.decode(b'', final=True)
+    if pending:
+        yield pending
+
+
+class CsvRows(object):
+    """ Rows of a csv api response: first the header, then every row with
+    its timestamp and its values as floats. Every iteration decodes the body
+    again line by line, so the rows are never all held in memory.
+    """
+
+    def __init__(self, body):
+        """ Initialize the rows
+
+        Keyword Arguments:
+            body:  The body of the api response
+        """
+        self.body = body
+
+    def __iter__(self):
+        rows = csv.reader(_lines(self.body))
+        for header in rows:
+            if header:
+                yield header
+                break
+        for row in rows:
+            if row:
+                yield [row[0]] + [float(value) for value in row[1:]]
+
+    def __sizeof__(self):
+        return object.__sizeof__(self) + len(self.body)
+
+
+class CsvParser(object):
+    """ Incremental parser of the csv api responses, the counterpart of the
+    SeriesParser for datatype='csv'. The body is given chunk by chunk as it
+    is received, and its rows are decoded window by window into the same
+    column buffers. A json body (the errors of the api are always json) is
+    kept as text to be decoded as usual.
+    """
+
+    def __init__(self, window=65536, schema=None):
+        """ Initialize the parser
+
+        Keyword Arguments:
+            window:  Amount of characters of rows decoded at once
+                (default 65536)
+            schema:  The Schema of the api function, the header is checked
+                against its normalized names (default None)
+        """
+        self.window = window
+        self.schema = schema
+        # The json body, or the rows not decoded yet
+        self.text = ''
+        self._decoder = codecs.getincrementaldecoder('utf-8')()
+        self._json = False
+        self._header = None
+        self._index = []
+        self._buffers = None
+
+    def feed(self, chunk):
+        """ Parse the next chunk of the body
+
+        Keyword Arguments:
+            chunk:  Bytes (or text) of the body
+        """
+        if isinstance(chunk, bytes):
+            chunk = self._decoder.decode(chunk)
+        self.text += chunk
+        if self._json:
+            return
+        if self._header is None:
+            start = self.text.lstrip()[:1]
+            if start == '{':
+                self._json = True
+                return
+            end = self.text.find('\n')
+            if not start or end < 0:
+                return
+            self._set_header(next(csv.reader([self.text[:end]])))
+            self.text = self.text[end + 1:]
+        if len(self.text) >= self.window:
+            self._parse()
+
+    def _set_header(self, header):
+        """ Keep the header of the csv, checking it against the schema
+        """
+        self._header = header
+        if self.schema is not None:
+            self.schema.check(
+                [normalize_name(column) for column in header[1:]],
+                normalized=True)
+
+    def _parse(self, final=False):
+        """ Decode the complete rows of the pending text, keeping the last
+        incomplete one for the next chunk
+        """
+        end = len(self.text) if final else self.text.rfind('\n') + 1
+        if not end:
+            return
+        rows = [row for row in csv.reader(self.text[:end].splitlines())
+                if row]
+        self.text = self.text[end:]
+        if not rows:
+            return
+        if self._buffers is None:
+            self._buffers = _ColumnBuffers(self._header[1:], len(rows))
+        try:
+            values = numpy.array([row[1:] for row in rows], dtype=float)
+        except ValueError:
+            raise ValueError('The csv response has malformed rows')
+        if values.shape != (len(rows), len(self._buffers.columns)):
+            raise ValueError('The csv response has malformed rows')
+        self._buffers.append(values)
+        self._index.extend(row[0] for row in rows)
+
+    def close(self):
+        """ Return the SeriesColumns of the response once all the body was
+        given, the first column of the csv being the dates. It returns None
+        if the body is json or empty, the body is then left in the text
+        attribute.
+        """
+        self.feed(self._decoder.decode(b'', final=True))
+        if not self._json and self._header is None and self.text.strip():
+            # Only a header
+            self._set_header(next(csv.reader([self.text.strip()])))
+            self.text = ''
+        if self._json or self._header is None:
+            return None
+        self._parse(final=True)
+        if self._buffers is None:
+            return SeriesColumns([], list(self._header[1:]),
+                                 numpy.empty((0, len(self._header) - 1)))
+        return SeriesColumns(self._index, self._buffers.columns,
+                             self._buffers.values())
+
+
+def parse_csv(body, window=65536, schema=None):
+    """ Parse a whole csv body with a CsvParser, returning None if it is json
+
+    Keyword Arguments:
+        body:  The body of the api response
+        window:  Amount of the body given to the parser at once
+            (default 65536)
+        schema:  The Schema of the api function (default None)
+    """
+    parser = CsvParser(window, schema)
+    for start in range(0, len(body), window):
+        parser.feed(body[start:start + window])
+    return parser.close()
@@ -0,0 +1,90 @@
+#!/usr/bin/env python
+import importlib
+from collections import OrderedDict
+
+# Functions returning the loads function of every json decoder by name, in
+# the order they are preferred: the fastest first, as measured on the test
+# data by benchmarks/bench_decoders.py. The decoders that were not measured
+# (ujson) come after the json module, so they are only used when chosen by
+# name. The decoders are imported on first use, the ones that are not
+# installed raise ImportError.
+_DECODERS = OrderedDict()
+# The loads functions already imported by name, None for the automatic choice
+_LOADED = {}
+
+
+def _module_loads(module):
+    """ Return the function importing the loads function of a module
+    """
+    return lambda: importlib.import_module(module).loads
+
+
+def register_decoder(name, loader, preferred=False):
+    """ Register a json decoder, replacing the one with the same name
+
+    Keyword Arguments:
+        name:  The name of the decoder, given as json_decoder to the clients
+        loader:  Function returning the loads function of the decoder, that
+            takes the body of a response (bytes or text). It raises
+            ImportError when the decoder is not installed.
+        preferred:  Whether the automatic choice tries it before the
+            registered decoders, else after them (default False)
+    """
+    others = [(other, other_loader) for other, other_loader
+              in _DECODERS.items() if other != name]
+    _DECODERS.clear()
+    if preferred:
+        _DECODERS[name] = loader
+    _DECODERS.update(others)
+    _DECODERS[name] = loader
+    _LOADED.clear()
+
+
+def available_decoders():
+    """ Return the names of the registered decoders that are installed, in
+    the order they are preferred
+    """
+    names = []
+    for name in _DECODERS:
+        try:
+            get_decoder(name)
+        except ValueError:
+            continue
+        names.append(name)
+    return names
+
+
+def get_decoder(name=None):
+    """ Return the loads function of a json decoder. It raises ValueError if
+    the decoder is unknown or not installed.
+
+    Keyword Arguments:
+        name:  The name of the decoder, or None for the fastest one installed
+            (default None)
+    """
+    loads = _LOADED.get(name)
+    if loads is not None:
+        return loads
+    if name is None:
+        # The standard library json is always installed
+        for candidate in _DECODERS:
+            try:
+                loads = get_decoder(candidate)
+                break
+            except ValueError:
+                continue
+    elif name not in _DECODERS:
+        raise ValueError('Json decoder: {} not recognized, only {} are '
+                         'supported'.format(name, ', '.join(_DECODERS)))
+    else:
+        try:
+            loads = _DECODERS[name]()
+        except ImportError:
+            raise ValueError('The json decoder {} was not found, please '
+                             'install it manually'.format(name))
+    _LOADED[name] = loads
+    return loads
+
+
+for _name in ('orjson', 'json', 'ujson', 'simplejson'):
+    register_decoder(_name, _module_loads(_name))
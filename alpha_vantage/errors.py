@@ -0,0 +1,43 @@
+#!/usr/bin/env python
+
+
+class AlphaVantageError(ValueError):
+    """ Base class of the errors answered by the api. It is a ValueError, as
+    all the errors raised by this library, so existing error handling keeps
+    working. Errors are permanent unless their retryable flag is set.
+    """
+    retryable = False
+
+
+class InvalidRequestError(AlphaVantageError):
+    """ The api answered with an 'Error Message', usually because of an
+    invalid symbol or parameter. Sending the same call again can not succeed.
+    """
+
+
+class InformationError(AlphaVantageError):
+    """ The api answered with an 'Information' message (and the instance
+    treats information as errors), for example because the call needs a
+    premium key.
+    """
+
+
+class ThrottleError(AlphaVantageError):
+    """ The api rejected the call because the call frequency of the key was
+    exceeded, it can succeed once the quota window opens again. retry_after
+    holds the seconds until then when they are known, and api_key the key
+    that was throttled when it was chosen from a KeyPool.
+    """
+    retryable = True
+
+    def __init__(self, message, retry_after=None, api_key=None):
+        super(ThrottleError, self).__init__(message)
+        self.retry_after = retry_after
+        self.api_key = api_key
+
+
+class EmptyResponseError(AlphaVantageError):
+    """ The api answered without any data, usually a transient problem of
+    the api side.
+    """
+    retryable = True
@@ -11,7 +11,7 @@ class ForeignExchange(av):
         """
         super(ForeignExchange, self).__init__(*args, **kwargs)
         self._append_type = False
-        if self.output_format.lower() == 'csv' or self.output_format.lower() == 'pandas':
+        if self.output_format.lower() in ('csv', 'pandas', 'numpy'):
             raise ValueError("Output format {} is not compatible with the ForeignExchange class".format(
                 self.output_format.lower()))
 
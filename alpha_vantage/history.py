@@ -0,0 +1,101 @@
+#!/usr/bin/env python
+import json
+import sqlite3
+from collections import OrderedDict
+
+
+class HistoryStore(object):
+    """ Full histories of the time series kept in a SQLite database file, so
+    that they can be refreshed with compact calls (the last 100 points)
+    instead of downloading the full series again.
+    """
+
+    def __init__(self, path, timeout=30):
+        """ Initialize the store, creating the database if needed
+
+        Keyword Arguments:
+            path:  Path of the database file
+            timeout:  Seconds to wait for the lock of the database (default 30)
+        """
+        self.path = path
+        self.timeout = timeout
+        connection = self._connect()
+        try:
+            connection.execute('CREATE TABLE IF NOT EXISTS histories '
+                               '(key TEXT PRIMARY KEY, body TEXT)')
+        finally:
+            connection.close()
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=self.timeout,
+                               isolation_level=None)
+
+    def get(self, key):
+        """ Return the stored json response of a full call, or None
+
+        Keyword Arguments:
+            key:  The url of the full call without its api key
+        """
+        connection = self._connect()
+        try:
+            row = connection.execute('SELECT body FROM histories WHERE '
+                                     'key = ?', (key,)).fetchone()
+        finally:
+            connection.close()
+        return json.loads(row[0]) if row is not None else None
+
+    def set(self, key, history):
+        """ Store the json response of a full call
+
+        Keyword Arguments:
+            key:  The url of the full call without its api key
+            history:  The json response
+        """
+        connection = self._connect()
+        try:
+            connection.execute('INSERT OR REPLACE INTO histories (key, body) '
+                               'VALUES (?, ?)', (key, json.dumps(history)))
+        finally:
+            connection.close()
+
+
+def merge_history(history, update, adjusted=False):
+    """ Merge the json response of a compact call into the stored response
+    of the full call, returning the merged response. The new and changed
+    points are taken from the update. It returns None when the full series
+    has to be downloaded again: when the update does not reach the last
+    stored point, so that some points would be missing, or when an adjusted
+    series changed some of its older points, since a dividend or a split
+    changes the adjusted values of the whole history. The points of the
+    merged series are ordered like the ones of the api, the newest first.
+
+    Keyword Arguments:
+        history:  The stored json response of the full call
+        update:  The json response of the compact call
+        adjusted:  Whether the series has adjusted values (default False)
+    """
+    merged = OrderedDict()
+    for name, points in update.items():
+        if name == 'Meta Data':
+            # The update tells the last refresh, but the output size of the
+            # merged series is still the full one
+            meta_data = dict(points)
+            for field, value in history.get(name, {}).items():
+                if 'Output Size' in field:
+                    meta_data[field] = value
+            merged[name] = meta_data
+            continue
+        stored = history.get(name)
+        if not stored or not points:
+            return None
+        last_stored = max(stored)
+        if min(points) > last_stored:
+            return None
+        if adjusted and any(stored[date] != point
+                            for date, point in points.items()
+                            if date in stored and date != last_stored):
+            return None
+        series = dict(stored)
+        series.update(points)
+        merged[name] = OrderedDict(sorted(series.items(), reverse=True))
+    return merged
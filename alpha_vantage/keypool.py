@@ -0,0 +1,106 @@
+#!/usr/bin/env python
+import hashlib
+import random
+import socket
+import time
+from .ratelimiter import RateLimiter, MemoryBackend
+
+
+class KeyPool(object):
+    """ Pool of api keys that spreads the api calls across them. Every key
+    has its own token bucket budget, so the pool tracks the calls each key
+    has left; a call goes to one of the keys with budget left, chosen at
+    random in proportion to their weights. When the api throttles a key
+    anyway, its budget is emptied and the following calls fail over to the
+    other keys. Give the pool as the key of the TimeSeries, TechIndicators,
+    CryptoCurrencies, ForeignExchange and SectorPerformances instances.
+    """
+
+    def __init__(self, keys, calls_per_minute=5, calls_per_day=500,
+                 backend=None):
+        """ Initialize the pool
+
+        Keyword Arguments:
+            keys:  List of api keys, or dictionary of api key to its weight.
+                The quotas of a key are multiplied by its weight, for example
+                a weight of 15 for a premium key with 75 calls per minute.
+            calls_per_minute:  Calls per minute of a key of weight 1, None
+                for no limit (default 5)
+            calls_per_day:  Calls per day of a key of weight 1, None for no
+                limit (default 500)
+            backend:  Where the budgets of the keys are kept, see RateLimiter.
+                If None a new MemoryBackend is used (default None)
+        """
+        if not isinstance(keys, dict):
+            keys = dict((key, 1) for key in keys)
+        if not keys:
+            raise ValueError('The key pool needs at least one api key')
+        self.weights = keys
+        self.backend = backend if backend is not None else MemoryBackend()
+        self.limiters = {}
+        for key, weight in keys.items():
+            # Keep the keys themselves out of the (possibly shared) backend
+            name = hashlib.sha1(key.encode('utf-8')).hexdigest()[:16] + '.'
+            self.limiters[key] = RateLimiter(
+                calls_per_minute=calls_per_minute and
+                calls_per_minute * weight,
+                calls_per_day=calls_per_day and calls_per_day * weight,
+                backend=self.backend, name=name)
+
+    @property
+    def keys(self):
+        """ The api keys of the pool
+        """
+        return list(self.weights)
+
+    def remaining(self):
+        """ Return a dictionary with the amount of calls every key can send
+        right away
+        """
+        return dict((key, limiter.remaining())
+                    for key, limiter in self.limiters.items())
+
+    def reserve(self):
+        """ Try to take a token for one call from one of the keys. It returns
+        a tuple of the key and 0 when a key had budget left, otherwise None
+        and the seconds to wait before trying again.
+        """
+        # Weighted random order (Efraimidis-Spirakis)
+        keys = sorted(self.weights, reverse=True, key=lambda key:
+                      random.random() ** (1.0 / self.weights[key]))
+        wait = None
+        for key in keys:
+            key_wait = self.limiters[key].reserve()
+            if key_wait <= 0:
+                return key, 0
+            wait = key_wait if wait is None else min(wait, key_wait)
+        return None, wait
+
+    def acquire(self, deadline=None):
+        """ Block until one of the keys can send a call, returning that key.
+        It raises socket.timeout right away when the wait would go past the
+        deadline.
+
+        Keyword Arguments:
+            deadline:  The time by which a key must be chosen, None for no
+                limit (default None)
+        """
+        while True:
+            key, wait = self.reserve()
+            if key is not None:
+                return key
+            if deadline is not None and time.time() + wait > deadline:
+                raise socket.timeout('No api key of the pool has budget left '
+                                     'before the deadline of the call')
+            time.sleep(wait)
+
+    def throttled(self, key):
+        """ Tell the pool that the api throttled a call of the key, emptying
+        its budget. It returns the seconds until any key can send a call
+        again, 0 if another key has budget left.
+
+        Keyword Arguments:
+            key:  The api key that was throttled
+        """
+        self.limiters[key].throttled()
+        return min(limiter.wait_time() for limiter in self.limiters.values())
@@ -0,0 +1,55 @@
+#!/usr/bin/env python
+import importlib
+import sys
+try:
+    from importlib.util import find_spec as _find_spec
+except ImportError:
+    # Python 2
+    from pkgutil import find_loader as _find_spec
+
+
+def module_found(name):
+    """ Return whether a module is installed, without importing it
+
+    Keyword Arguments:
+        name:  The name of the module, like 'pandas'
+    """
+    try:
+        return _find_spec(name) is not None
+    except (ImportError, ValueError):
+        return False
+
+
+def module_loaded(name):
+    """ Return whether a module was already imported. An object can only be
+    an instance of its classes, like a pandas data frame, once it was.
+
+    Keyword Arguments:
+        name:  The name of the module
+    """
+    return name in sys.modules
+
+
+class LazyModule(object):
+    """ A module imported on the first access to one of its attributes, so
+    that the heavy optional dependencies (pandas and numpy) are only imported
+    when an output needs them. Importing alpha_vantage stays cheap for the
+    workers that only use the json output.
+    """
+
+    def __init__(self, name):
+        """ Initialize the module
+
+        Keyword Arguments:
+            name:  The name of the module, like 'pandas'
+        """
+        self._name = name
+
+    def __getattr__(self, attribute):
+        value = getattr(importlib.import_module(self._name), attribute)
+        # Found without calling __getattr__ afterwards
+        self.__dict__[attribute] = value
+        return value
+
+    def __repr__(self):
+        return '<lazy module {!r}>'.format(self._name)
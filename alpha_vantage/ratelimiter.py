@@ -0,0 +1,258 @@
+#!/usr/bin/env python
+import socket
+import sqlite3
+import threading
+import time
+
+
+class RateLimiter(object):
+    """ Client side token bucket rate limiter, that blocks the api calls
+    before they are sent instead of letting the api reject them. Give the same
+    limiter to all the TimeSeries, TechIndicators, CryptoCurrencies,
+    ForeignExchange and SectorPerformances instances to make them share one
+    budget. Use a SQLiteBackend to share it across processes too.
+    """
+
+    def __init__(self, calls_per_minute=5, calls_per_day=500, backend=None,
+                 name=''):
+        """ Initialize the limiter
+
+        Keyword Arguments:
+            calls_per_minute:  Maximum amount of calls per minute, None for no
+                limit (default 5)
+            calls_per_day:  Maximum amount of calls per day, None for no limit
+                (default 500)
+            backend:  Where the state of the buckets is kept, a MemoryBackend
+                (shared by the threads of the process) or a SQLiteBackend
+                (shared by the processes using the same database file). If
+                None a new MemoryBackend is used (default None)
+            name:  Prefix of the bucket names, so that several limiters keep
+                separate budgets in the same backend (default '')
+        """
+        self.calls_per_minute = calls_per_minute
+        self.calls_per_day = calls_per_day
+        self.backend = backend if backend is not None else MemoryBackend()
+        # Tuples of bucket name, capacity and seconds to fill it completely
+        self._buckets = []
+        if calls_per_minute:
+            self._buckets.append((name + 'minute', calls_per_minute, 60.0))
+        if calls_per_day:
+            self._buckets.append((name + 'day', calls_per_day, 86400.0))
+
+    def reserve(self):
+        """ Try to take a token for one call. It returns 0 when the call can
+        be sent right away, otherwise the seconds to wait before trying again
+        (no token is taken in that case).
+        """
+        return self.backend.update(_take_token, self._buckets, time.time())
+
+    def wait_time(self):
+        """ Return the seconds until a call can be sent, without taking a
+        token for it.
+        """
+        return self.backend.update(_peek_token, self._buckets, time.time())
+
+    def release(self):
+        """ Give back the token taken by reserve for a call that was not
+        sent after all
+        """
+        self.backend.update(_return_token, self._buckets, time.time())
+
+    def remaining(self):
+        """ Return the amount of calls that can be sent right away
+        """
+        return self.backend.update(_remaining_tokens, self._buckets,
+                                   time.time())
+
+    def acquire(self, deadline=None):
+        """ Block until a call can be sent, taking a token for it. It
+        raises socket.timeout right away, without taking a token, when the
+        wait would go past the deadline.
+
+        Keyword Arguments:
+            deadline:  The time by which the token must be taken, None for no
+                limit (default None)
+        """
+        while True:
+            wait = self.reserve()
+            if wait <= 0:
+                return
+            if deadline is not None and time.time() + wait > deadline:
+                raise socket.timeout('The rate limiter has no budget left '
+                                     'before the deadline of the call')
+            time.sleep(wait)
+
+    def throttled(self):
+        """ Tell the limiter that the api throttled a call, so its budget
+        was used up in spite of what the limiter counted (for example by
+        another client using the same key). The shortest bucket is emptied,
+        making the next calls wait for its next token. It returns the seconds
+        until then.
+        """
+        return self.backend.update(_empty_bucket, self._buckets, time.time())
+
+
+def _refill(state, buckets, now):
+    """ Return the tokens of every bucket refilled for the time elapsed since
+    their last update, and the seconds until all of them have a token (0 if
+    they have one already).
+
+    Keyword Arguments:
+        state:  Dictionary of bucket name to (tokens, last update)
+        buckets:  List of (bucket name, capacity, seconds to fill it) tuples
+        now:  The current time
+    """
+    wait = 0.0
+    levels = {}
+    for name, capacity, period in buckets:
+        tokens, updated = state.get(name, (capacity, now))
+        tokens = min(capacity,
+                     tokens + max(0.0, now - updated) * capacity / period)
+        levels[name] = tokens
+        if tokens < 1:
+            wait = max(wait, (1 - tokens) * period / capacity)
+    return levels, wait
+
+
+def _take_token(state, buckets, now):
+    """ Refill the buckets and take a token from all of them if all have one.
+    It returns 0 when the token was taken, otherwise the seconds until all
+    buckets have one.
+
+    Keyword Arguments:
+        state:  Dictionary of bucket name to (tokens, last update), updated in
+            place
+        buckets:  List of (bucket name, capacity, seconds to fill it) tuples
+        now:  The current time
+    """
+    levels, wait = _refill(state, buckets, now)
+    for name, tokens in levels.items():
+        state[name] = (tokens - 1 if wait == 0 else tokens, now)
+    return wait
+
+
+def _return_token(state, buckets, now):
+    """ Refill the buckets and give a token back to all of them, up to
+    their capacity
+
+    Keyword Arguments:
+        state:  Dictionary of bucket name to (tokens, last update), updated in
+            place
+        buckets:  List of (bucket name, capacity, seconds to fill it) tuples
+        now:  The current time
+    """
+    levels, _ = _refill(state, buckets, now)
+    for name, capacity, _ in buckets:
+        state[name] = (min(capacity, levels[name] + 1), now)
+
+
+def _peek_token(state, buckets, now):
+    """ Return the seconds until all the buckets have a token, see _refill
+    """
+    return _refill(state, buckets, now)[1]
+
+
+def _remaining_tokens(state, buckets, now):
+    """ Return the amount of whole tokens in the emptiest bucket, see _refill
+    """
+    levels, _ = _refill(state, buckets, now)
+    if not levels:
+        return float('inf')
+    return int(min(levels.values()))
+
+
+def _empty_bucket(state, buckets, now):
+    """ Empty the bucket that fills up the fastest, returning the seconds
+    until it has a token again.
+
+    Keyword Arguments:
+        state:  Dictionary of bucket name to (tokens, last update), updated in
+            place
+        buckets:  List of (bucket name, capacity, seconds to fill it) tuples
+        now:  The current time
+    """
+    if not buckets:
+        return 0.0
+    name, capacity, period = min(buckets, key=lambda bucket: bucket[2])
+    state[name] = (0.0, now)
+    return period / capacity
+
+
+class MemoryBackend(object):
+    """ Keep the state of the buckets in memory, shared by all the threads
+    of the process.
+    """
+
+    def __init__(self):
+        self._state = {}
+        self._lock = threading.Lock()
+
+    def update(self, func, buckets, now):
+        """ Update the state of the buckets atomically, returning the result
+        of func
+
+        Keyword Arguments:
+            func:  Function updating the state, like _take_token
+            buckets:  List of (bucket name, capacity, seconds to fill it)
+            now:  The current time
+        """
+        with self._lock:
+            return func(self._state, buckets, now)
+
+
+class SQLiteBackend(object):
+    """ Keep the state of the buckets in a SQLite database file, so that
+    several worker processes on the same host share a single budget.
+    """
+
+    def __init__(self, path, timeout=30):
+        """ Initialize the backend, creating the database if needed
+
+        Keyword Arguments:
+            path:  Path of the database file
+            timeout:  Seconds to wait for the lock of the database (default 30)
+        """
+        self.path = path
+        self.timeout = timeout
+        connection = self._connect()
+        try:
+            connection.execute('CREATE TABLE IF NOT EXISTS buckets '
+                               '(name TEXT PRIMARY KEY, tokens REAL, '
+                               'updated REAL)')
+        finally:
+            connection.close()
+
+    def _connect(self):
+        # Autocommit mode, so that the transactions are handled explicitly
+        return sqlite3.connect(self.path, timeout=self.timeout,
+                               isolation_level=None)
+
+    def update(self, func, buckets, now):
+        """ Update the state of the buckets atomically, returning the result
+        of func
+
+        Keyword Arguments:
+            func:  Function updating the state, like _take_token
+            buckets:  List of (bucket name, capacity, seconds to fill it)
+            now:  The current time
+        """
+        connection = self._connect()
+        try:
+            # Take the write lock before reading, so that no other process
+            # can change the buckets in between.
+            connection.execute('BEGIN IMMEDIATE')
+            state = {name: (tokens, updated) for name, tokens, updated in
+                     connection.execute('SELECT name, tokens, updated '
+                                        'FROM buckets')}
+            result = func(state, buckets, now)
+            connection.executemany('INSERT OR REPLACE INTO buckets '
+                                   '(name, tokens, updated) VALUES (?, ?, ?)',
+                                   [(name, tokens, updated) for name,
+                                    (tokens, updated) in state.items()])
+            connection.execute('COMMIT')
+            return result
+        except Exception:
+            connection.rollback()
+            raise
+        finally:
+            connection.close()
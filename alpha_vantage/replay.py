@@ -0,0 +1,175 @@
+#!/usr/bin/env python
+import io
+import mmap
+import os
+import struct
+import sys
+import threading
+import urllib
+try:
+    # urllib.request is not loaded by importing urllib alone in python 3
+    import urllib.request
+except ImportError:
+    pass
+# In order to keep supporting python 2.7, we have to do this.
+try:
+    from urllib.error import HTTPError
+except ImportError:
+    from urllib2 import HTTPError
+from .alphavantage import AlphaVantage
+from .transfer import content_encoding
+
+# Every record of an archive is this header followed by the url of the call
+# (without its api key), the content encoding and the body as received
+_RECORD_HEADER = struct.Struct('>IHQ')
+
+
+class RecordingTransport(object):
+    """ Transport that sends the api calls through another transport and
+    appends every response to an archive file, to replay them later with a
+    ReplayTransport. The bodies are stored as received, so gzip compressed
+    responses stay compressed in the archive.
+    """
+
+    def __init__(self, path, transport=None):
+        """ Initialize the transport
+
+        Keyword Arguments:
+            path:  Path of the archive file, the responses are appended to it
+                if it exists
+            transport:  Transport sending the calls, like a ConnectionPool.
+                If None, urllib is used (default None)
+        """
+        self.path = path
+        self.transport = transport
+        self._lock = threading.Lock()
+
+    def urlopen(self, url, headers=None, timeout=None):
+        """ Send the call and record its response, returning a file like
+        response with the same body
+
+        Keyword Arguments:
+            url:  The url of the service
+            headers:  Dictionary with extra request headers (default None)
+            timeout:  Seconds to wait for the response (default None)
+        """
+        response = self._open(url, headers or {}, timeout)
+        try:
+            encoding = content_encoding(response) or ''
+            body = response.read()
+        finally:
+            response.close()
+        if not isinstance(body, bytes):
+            body = body.encode('utf-8')
+        key = AlphaVantage._API_KEY_PARAMETER.sub('', url).encode('utf-8')
+        encoding_bytes = encoding.encode('ascii')
+        with self._lock:
+            with open(self.path, 'ab') as archive:
+                archive.write(_RECORD_HEADER.pack(
+                    len(key), len(encoding_bytes), len(body)))
+                archive.write(key + encoding_bytes + body)
+        return _ArchivedResponse(body, encoding)
+
+    def _open(self, url, headers, timeout):
+        if self.transport is not None:
+            return self.transport.urlopen(url, headers=headers,
+                                          timeout=timeout)
+        # In order to keep supporting python 2.7, we have to do this.
+        elif sys.version_info.major == 3:
+            request = urllib.request.Request(url, headers=headers)
+            if timeout is None:
+                return urllib.request.urlopen(request)
+            return urllib.request.urlopen(request, timeout=timeout)
+        return urllib.urlopen(url)
+
+
+class ReplayTransport(object):
+    """ Transport that answers the api calls from an archive written by a
+    RecordingTransport, without any network access. The archive is memory
+    mapped and indexed when the transport is created, so the responses are
+    served at memory speed. A call recorded several times gets its responses
+    in the recorded order, the last one being repeated once all were given.
+    A call not in the archive raises an HTTPError 404.
+    """
+
+    def __init__(self, path):
+        """ Initialize the transport, indexing the archive
+
+        Keyword Arguments:
+            path:  Path of the archive file
+        """
+        self.path = path
+        self._index = {}
+        self._served = {}
+        self._lock = threading.Lock()
+        self._archive = None
+        with open(path, 'rb') as archive:
+            if os.fstat(archive.fileno()).st_size:
+                self._archive = mmap.mmap(archive.fileno(), 0,
+                                          access=mmap.ACCESS_READ)
+        offset = 0
+        size = len(self._archive) if self._archive is not None else 0
+        while offset < size:
+            key_size, encoding_size, body_size = _RECORD_HEADER.unpack_from(
+                self._archive, offset)
+            offset += _RECORD_HEADER.size
+            key = self._archive[offset:offset + key_size].decode('utf-8')
+            offset += key_size
+            encoding = self._archive[offset:offset + encoding_size].decode(
+                'ascii')
+            offset += encoding_size
+            self._index.setdefault(key, []).append(
+                (offset, body_size, encoding))
+            offset += body_size
+
+    def urls(self):
+        """ Return the urls (without api key) of the recorded calls
+        """
+        return list(self._index)
+
+    def urlopen(self, url, headers=None, timeout=None):
+        """ Return the recorded response of the call as a file like response
+
+        Keyword Arguments:
+            url:  The url of the service
+            headers:  Ignored, the response is given as it was recorded
+            timeout:  Ignored
+        """
+        key = AlphaVantage._API_KEY_PARAMETER.sub('', url)
+        records = self._index.get(key)
+        if not records:
+            raise HTTPError(url, 404, 'The call is not in the archive {}'
+                            .format(self.path), {}, None)
+        with self._lock:
+            served = self._served.get(key, 0)
+            self._served[key] = served + 1
+        offset, body_size, encoding = records[min(served, len(records) - 1)]
+        return _ArchivedResponse(self._archive[offset:offset + body_size],
+                                 encoding)
+
+    def rewind(self):
+        """ Serve the responses from the first recorded one again
+        """
+        with self._lock:
+            self._served.clear()
+
+    def close(self):
+        """ Unmap the archive
+        """
+        if self._archive is not None:
+            self._archive.close()
+            self._archive = None
+
+
+class _ArchivedResponse(io.BytesIO):
+    """ File like response of a recorded body
+    """
+
+    def __init__(self, body, encoding):
+        super(_ArchivedResponse, self).__init__(body)
+        self._headers = {'Content-Encoding': encoding} if encoding else {}
+
+    def info(self):
+        """ Return the headers of the response
+        """
+        return self._headers
@@ -0,0 +1,116 @@
+#!/usr/bin/env python
+import random
+import socket
+from .errors import AlphaVantageError, ThrottleError
+# In order to keep supporting python 2.7, we have to do this.
+try:
+    from http.client import HTTPException
+    from urllib.error import HTTPError
+except ImportError:
+    from httplib import HTTPException
+    from urllib2 import HTTPError
+
+
+class RetryPolicy(object):
+    """ Decide whether and when a failed api call is sent again. Transient
+    errors (throttling, empty answers, network errors and server side http
+    errors) are retried with an exponential backoff and jitter, permanent
+    errors (like an invalid symbol) are raised right away. Throttled calls
+    are parked until the quota window opens again instead, for two minutes
+    at most by default.
+    """
+    # Http status codes worth retrying, any other http error is permanent
+    _RETRY_STATUS_CODES = (408, 429, 500, 502, 503, 504)
+    # Network errors, socket.error is an alias of OSError in python 3
+    _NETWORK_ERRORS = (socket.error, socket.timeout, HTTPException, IOError)
+
+    def __init__(self, retries=5, backoff_factor=0.5, max_backoff=60,
+                 jitter=True, deadline=None, throttle_wait=60,
+                 max_throttle_wait=120):
+        """ Initialize the policy
+
+        Keyword Arguments:
+            retries:  Maximum amount of retries after the first attempt
+                (default 5)
+            backoff_factor:  Seconds to wait before the first retry, doubled
+                on every following retry (default 0.5)
+            max_backoff:  Maximum amount of seconds to wait between two
+                attempts (default 60)
+            jitter:  Wait a random amount between 0 and the backoff instead
+                of the backoff itself, so that concurrent clients do not retry
+                all at the same time (default True)
+            deadline:  Maximum amount of seconds for all the attempts of a
+                call together, None for no limit. No retry is started if
+                waiting for it would exceed the deadline (default None)
+            throttle_wait:  Seconds to park a throttled call when the time
+                until the quota window opens again is not known, which is the
+                case without a rate limiter (default 60)
+            max_throttle_wait:  Maximum amount of seconds since the first
+                attempt of a call for which a throttled call is parked, None
+                for no limit besides the deadline (default 120)
+        """
+        self.retries = retries
+        self.backoff_factor = backoff_factor
+        self.max_backoff = max_backoff
+        self.jitter = jitter
+        self.deadline = deadline
+        self.throttle_wait = throttle_wait
+        self.max_throttle_wait = max_throttle_wait
+
+    def is_retryable(self, error):
+        """ Return True if the call that raised the error can succeed when
+        sent again.
+
+        Keyword Arguments:
+            error:  The exception raised by the call
+        """
+        if isinstance(error, AlphaVantageError):
+            return error.retryable
+        if isinstance(error, HTTPError):
+            return error.code in self._RETRY_STATUS_CODES
+        # Any other ValueError comes from decoding an incomplete answer
+        return isinstance(error, self._NETWORK_ERRORS + (ValueError,))
+
+    def backoff(self, attempt):
+        """ Return the seconds to wait before the given retry
+
+        Keyword Arguments:
+            attempt:  Number of the retry, starting from 0
+        """
+        delay = min(self.max_backoff, self.backoff_factor * 2 ** attempt)
+        if self.jitter:
+            delay = random.uniform(0, delay)
+        return delay
+
+    def next_delay(self, attempt, error, elapsed, retryable=None,
+                   deadline=None):
+        """ Return the seconds to wait before retrying a failed call, or None
+        if the call must not be retried.
+
+        Keyword Arguments:
+            attempt:  Number of retries already done
+            error:  The exception raised by the last attempt
+            elapsed:  Seconds elapsed since the first attempt
+            retryable:  Whether the error is transient, None to classify it
+                with is_retryable (default None)
+            deadline:  Maximum amount of seconds for all the attempts of this
+                call, None to use the deadline of the policy (default None)
+        """
+        if deadline is None:
+            deadline = self.deadline
+        if retryable is None:
+            retryable = self.is_retryable(error)
+        if attempt >= self.retries or not retryable:
+            return None
+        if isinstance(error, ThrottleError):
+            delay = error.retry_after
+            if delay is None:
+                delay = self.throttle_wait
+            if self.max_throttle_wait is not None and \
+                    elapsed + delay > self.max_throttle_wait:
+                return None
+        else:
+            delay = self.backoff(attempt)
+        if deadline is not None and elapsed + delay > deadline:
+            return None
+        return delay
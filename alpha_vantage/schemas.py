@@ -0,0 +1,175 @@
+#!/usr/bin/env python
+import re
+import warnings
+
+# The numbering of the names of the api, like "1. open", "1a. price (CNY)"
+# or "7: Time Zone"
+_NUMBERING = re.compile(r'^\d+[a-z]?[.:]\s*')
+_NOT_WORD = re.compile(r'[^0-9a-z]+')
+_FUNCTION_PARAMETER = re.compile(r'[?&]function=([^&]*)')
+_MARKET_PARAMETER = re.compile(r'[?&]market=([^&]*)')
+# Normalized names by name of the api, computed once
+_NORMALIZED_NAMES = {}
+
+
+class SchemaDriftWarning(UserWarning):
+    """ The columns of a response are not the ones of the schema of its api
+    function, the api changed its format. The columns of the response are
+    used as they are.
+    """
+
+
+def normalize_name(name):
+    """ Return the normalized name of a column of the api: without its
+    numbering, in lower case words joined by underscores, like
+    'adjusted_close' for '5. adjusted close' or 'open_usd' for
+    '1b. open (USD)'. They are the names of the csv responses.
+
+    Keyword Arguments:
+        name:  The name of the column in the json responses
+    """
+    normalized = _NORMALIZED_NAMES.get(name)
+    if normalized is None:
+        normalized = _NOT_WORD.sub(
+            '_', _NUMBERING.sub('', name).lower()).strip('_')
+        _NORMALIZED_NAMES[name] = normalized
+    return normalized
+
+
+class Schema(object):
+    """ The columns of the time series of an api function, in their order in
+    the responses, with their normalized names and their dtypes. The names
+    of the digital currency columns hold the market, written {market}.
+    """
+
+    def __init__(self, function, columns, names=None, dtypes=None):
+        """ Initialize the schema
+
+        Keyword Arguments:
+            function:  The api function, like 'TIME_SERIES_DAILY'
+            columns:  The names of the columns in the json responses
+            names:  The normalized names of the columns. If None, they are
+                given by normalize_name (default None)
+            dtypes:  The numpy dtypes of the values of the columns, like
+                int64 for the volumes of the stocks. The outputs only use
+                them in a compact mode, see alpha_vantage.compact. If None,
+                they are all float64 (default None)
+        """
+        self.function = function
+        self.columns = tuple(columns)
+        self.names = tuple(names) if names is not None else tuple(
+            normalize_name(column) for column in self.columns)
+        self.dtypes = tuple(dtypes) if dtypes is not None else \
+            ('float64',) * len(self.columns)
+        self._markets = {}
+
+    def for_market(self, market):
+        """ Return the schema with the given market in the names of its
+        columns. With the USD market, the columns in USD are given once.
+
+        Keyword Arguments:
+            market:  The market of the call, like 'CNY'
+        """
+        if not any('{market}' in column for column in self.columns):
+            return self
+        schema = self._markets.get(market)
+        if schema is None:
+            columns, dtypes = [], []
+            for column, dtype in zip(self.columns, self.dtypes):
+                column = column.format(market=market)
+                if column not in columns:
+                    columns.append(column)
+                    dtypes.append(dtype)
+            schema = Schema(self.function, columns, dtypes=dtypes)
+            self._markets[market] = schema
+        return schema
+
+    def check(self, columns, normalized=False):
+        """ Return True if the columns of a response are the ones of the
+        schema, else warn with a SchemaDriftWarning and return False.
+
+        Keyword Arguments:
+            columns:  The columns of the response
+            normalized:  Whether the columns are normalized names, like the
+                ones of the csv responses (default False)
+        """
+        expected = self.names if normalized else self.columns
+        if tuple(columns) == expected:
+            return True
+        warnings.warn(SchemaDriftWarning(
+            'The columns of {} changed, got {} instead of {}'.format(
+                self.function, list(columns), list(expected))))
+        return False
+
+
+def _sector_label(rank):
+    """ The name SectorPerformances always gave to a rank column, like
+    'Rank A: Real-Time Performance'
+    """
+    return re.sub(r'\d+.', '', rank).strip(' ')
+
+
+_PRICES = ('1. open', '2. high', '3. low', '4. close')
+_PRICE_DTYPES = ('float64',) * 4
+_DIGITAL_PRICES = ('1a. open ({market})', '1b. open (USD)',
+                   '2a. high ({market})', '2b. high (USD)',
+                   '3a. low ({market})', '3b. low (USD)',
+                   '4a. close ({market})', '4b. close (USD)',
+                   '5. volume', '6. market cap (USD)')
+_SECTOR_RANKS = ('Rank A: Real-Time Performance',
+                 'Rank B: 1 Day Performance',
+                 'Rank C: 5 Day Performance',
+                 'Rank D: 1 Month Performance',
+                 'Rank E: 3 Month Performance',
+                 'Rank F: Year-to-Date (YTD) Performance',
+                 'Rank G: 1 Year Performance',
+                 'Rank H: 3 Year Performance',
+                 'Rank I: 5 Year Performance',
+                 'Rank J: 10 Year Performance')
+
+# Schemas by api function, add to it for the functions without one
+SCHEMAS = dict((schema.function, schema) for schema in (
+    Schema('TIME_SERIES_INTRADAY', _PRICES + ('5. volume',),
+           dtypes=_PRICE_DTYPES + ('int64',)),
+    Schema('TIME_SERIES_DAILY', _PRICES + ('5. volume',),
+           dtypes=_PRICE_DTYPES + ('int64',)),
+    Schema('TIME_SERIES_DAILY_ADJUSTED', _PRICES + (
+        '5. adjusted close', '6. volume', '7. dividend amount',
+        '8. split coefficient'),
+        dtypes=_PRICE_DTYPES + ('float64', 'int64', 'float64', 'float64')),
+    Schema('TIME_SERIES_WEEKLY', _PRICES + ('5. volume',),
+           dtypes=_PRICE_DTYPES + ('int64',)),
+    Schema('TIME_SERIES_WEEKLY_ADJUSTED', _PRICES + (
+        '5. adjusted close', '6. volume', '7. dividend amount'),
+        dtypes=_PRICE_DTYPES + ('float64', 'int64', 'float64')),
+    Schema('TIME_SERIES_MONTHLY', _PRICES + ('5. volume',),
+           dtypes=_PRICE_DTYPES + ('int64',)),
+    Schema('TIME_SERIES_MONTHLY_ADJUSTED', _PRICES + (
+        '5. adjusted close', '6. volume', '7. dividend amount'),
+        dtypes=_PRICE_DTYPES + ('float64', 'int64', 'float64')),
+    Schema('DIGITAL_CURRENCY_INTRADAY', (
+        '1a. price ({market})', '1b. price (USD)', '2. volume',
+        '3. market cap (USD)')),
+    Schema('DIGITAL_CURRENCY_DAILY', _DIGITAL_PRICES),
+    Schema('DIGITAL_CURRENCY_WEEKLY', _DIGITAL_PRICES),
+    Schema('DIGITAL_CURRENCY_MONTHLY', _DIGITAL_PRICES),
+    Schema('SECTOR', _SECTOR_RANKS,
+           names=[_sector_label(rank) for rank in _SECTOR_RANKS]),
+))
+
+
+def schema_for(url):
+    """ Return the Schema of the api function of a call, or None if it has
+    none
+
+    Keyword Arguments:
+        url:  The url of the call
+    """
+    match = _FUNCTION_PARAMETER.search(url)
+    if match is None:
+        return None
+    schema = SCHEMAS.get(match.group(1).upper())
+    if schema is None:
+        return None
+    market = _MARKET_PARAMETER.search(url)
+    return schema.for_market(market.group(1).upper() if market else 'USD')
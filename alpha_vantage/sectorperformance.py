@@ -1,11 +1,15 @@
 #!/usr/bin/env python
 from .alphavantage import AlphaVantage as av
 from functools import wraps
-try:
-    import pandas
-except ImportError:
-    pass
 import re
+from .compact import compact_frame
+from .lazy import LazyModule
+from .schemas import SCHEMAS, normalize_name
+
+# Only imported once a pandas output is built
+pandas = LazyModule('pandas')
+# Names of the rank columns of the pandas output
+_RANK_NAMES = dict(zip(SCHEMAS['SECTOR'].columns, SCHEMAS['SECTOR'].names))
 
 
 class SectorPerformances(av):
@@ -18,9 +22,12 @@ class SectorPerformances(av):
         """
         super(SectorPerformances, self).__init__(*args, **kwargs)
         self._append_type = False
-        if self.output_format.lower() == 'csv':
+        if self.output_format.lower() in ('csv', 'numpy'):
             raise ValueError("Output format {} is not comatible with the SectorPerformances class".format(
                 self.output_format.lower()))
+        if self.datatype == 'csv':
+            raise ValueError("Data type csv is not compatible with the "
+                             "SectorPerformances class")
 
     def percentage_to_float(self, val):
         """ Transform a string of ther form f.f% into f.f/100
@@ -42,36 +49,62 @@ class SectorPerformances(av):
         """
         @wraps(func)
         def _format_wrapper(self, *args, **kwargs):
-            json_response, data_key, meta_data_key = func(
-                self, *args, **kwargs)
-            if isinstance(data_key, list):
-                # Replace the strings into percentage
-                data = {key: {k: self.percentage_to_float(v)
-                              for k, v in json_response[key].items()} for key in data_key}
-            else:
-                data = json_response[data_key]
-            # TODO: Fix orientation in a better way
-            meta_data = json_response[meta_data_key]
-            # Allow to override the output parameter in the call
-            if override is None:
-                output_format = self.output_format.lower()
-            elif 'json' or 'pandas' in override.lower():
-                output_format = override.lower()
-            # Choose output format
-            if output_format == 'json':
-                return data, meta_data
-            elif output_format == 'pandas':
-                data_pandas = pandas.DataFrame.from_dict(data,
-                                                         orient='columns')
-                # Rename columns to have a nicer name
-                col_names = [re.sub(r'\d+.', '', name).strip(' ')
+            return self._format_call(func, args, kwargs, self._format_sector,
+                                     override)
+        return _format_wrapper
+
+    def _format_sector(self, json_response, data_key, meta_data_key,
+                       override=None):
+        """ Give the response of the sector api call its right format, either
+        json or pandas (replacing the % for usable floats, range 0-1.0)
+
+        Keyword Arguments:
+            json_response: The response returned by _handle_api_call
+            data_key: The key (or list of keys) for getting the data from the
+            json object
+            meta_data_key: The key for getting the meta data information out
+            of the json object
+            override: Override the internal format of the call, default None
+        """
+        if isinstance(data_key, list):
+            # Replace the strings into percentage
+            data = {key: {k: self.percentage_to_float(v)
+                          for k, v in json_response[key].items()}
+                    for key in data_key}
+        else:
+            data = json_response[data_key]
+        # TODO: Fix orientation in a better way
+        meta_data = json_response[meta_data_key]
+        # Allow to override the output parameter in the call
+        if override is None:
+            output_format = self.output_format.lower()
+        elif 'json' or 'pandas' in override.lower():
+            output_format = override.lower()
+        # Choose output format
+        if output_format == 'json':
+            return data, meta_data
+        elif output_format == 'pandas':
+            data_pandas = pandas.DataFrame.from_dict(data,
+                                                     orient='columns')
+            if self.normalize_columns:
+                # Like the columns of the other functions, for example
+                # 'rank_b_1_day_performance'
+                col_names = [normalize_name(name)
                              for name in list(data_pandas)]
-                data_pandas.columns = col_names
-                return data_pandas, meta_data
             else:
-                raise ValueError('Format: {} is not supported'.format(
-                    self.output_format))
-        return _format_wrapper
+                # Rename columns to have a nicer name, given by the schema
+                col_names = [_RANK_NAMES.get(name) or
+                             re.sub(r'\d+.', '', name).strip(' ')
+                             for name in list(data_pandas)]
+            data_pandas.columns = col_names
+            if self.compact is not None:
+                data_pandas = compact_frame(data_pandas, self.compact)
+                # The sectors as categories
+                data_pandas.index = pandas.CategoricalIndex(data_pandas.index)
+            return data_pandas, meta_data
+        else:
+            raise ValueError('Format: {} is not supported'.format(
+                self.output_format))
 
     @_output_format_sector
     @av._call_api_on_func
@@ -0,0 +1,258 @@
+#!/usr/bin/env python
+import codecs
+import json
+import re
+from collections import OrderedDict
+from .lazy import LazyModule, module_found
+# Numpy comes with pandas, it is only needed for the pandas and numpy output
+# formats and only imported once they are built
+numpy = LazyModule('numpy')
+_NUMPY_FOUND = module_found('numpy')
+
+# A key whose value is an object of objects, like "Time Series (1min)": {
+# "2017-12-18 14:56:00": {, the bars start at the second group
+_SERIES_START = re.compile(r'"([^"]+)"\s*:\s*\{\s*("[^"]*"\s*:\s*\{)')
+# The end of the last bar followed by the end of the series, the bars have no
+# nested objects
+_SERIES_END = re.compile(r'\}\s*\}')
+# Between the bars
+_SEPARATORS = re.compile(r'[\s,]*')
+
+
+class SeriesColumns(object):
+    """ Time series parsed into columns: the dates of the bars in the order
+    of the response, the names of their fields and a two dimensional float64
+    array with a row per bar and a column per field. The array is a view of
+    column major buffers, every column is contiguous in memory.
+    """
+
+    def __init__(self, index, columns, values):
+        self.index = index
+        self.columns = columns
+        self.values = values
+
+    def __len__(self):
+        return len(self.index)
+
+    @classmethod
+    def from_dict(cls, data):
+        """ Return the SeriesColumns of a time series decoded as a
+        dictionary of bars, or None if the data is not a time series
+
+        Keyword Arguments:
+            data:  Dictionary of the bars by date
+        """
+        if not data or not all(isinstance(bar, dict)
+                               for bar in data.values()):
+            return None
+        columns = []
+        for bar in data.values():
+            for column in bar:
+                if column not in columns:
+                    columns.append(column)
+        values = numpy.array([[bar.get(column, 'nan') for column in columns]
+                              for bar in data.values()], dtype=float)
+        return cls(list(data), columns, numpy.asfortranarray(values))
+
+    def arrays(self):
+        """ Return an ordered dictionary with the array of the dates under
+        'date' followed by the float64 array of every column. The columns
+        are views of the parsed buffers, they are not copied.
+        """
+        arrays = OrderedDict([('date', numpy.array(self.index))])
+        for i, column in enumerate(self.columns):
+            arrays[column] = self.values[:, i]
+        return arrays
+
+
+class _ColumnBuffers(object):
+    """ Growing float64 buffers of the columns of a series, with a row per
+    column so that the columns are contiguous. They grow geometrically, so
+    appending the rows costs amortized constant time.
+    """
+
+    def __init__(self, columns, capacity=1024):
+        self.columns = columns
+        self.size = 0
+        self._values = numpy.empty((len(columns), capacity))
+
+    def add_column(self, column):
+        """ Add a column, not a number for the rows already appended
+        """
+        self.columns.append(column)
+        self._values = numpy.vstack((self._values, numpy.full(
+            (1, self._values.shape[1]), numpy.nan)))
+
+    def append(self, rows):
+        """ Append a two dimensional array with a row per bar
+        """
+        capacity = self._values.shape[1]
+        if self.size + len(rows) > capacity:
+            grown = numpy.empty((len(self.columns),
+                                 max(2 * capacity, self.size + len(rows))))
+            grown[:, :self.size] = self._values[:, :self.size]
+            self._values = grown
+        self._values[:, self.size:self.size + len(rows)] = rows.T
+        self.size += len(rows)
+
+    def values(self):
+        """ Return the two dimensional array of the appended rows, a view of
+        the buffers
+        """
+        return self._values[:, :self.size].T
+
+
+class SeriesParser(object):
+    """ Incremental parser of the api responses holding a time series. The
+    body is given chunk by chunk as it is received, and the bars are decoded
+    window by window straight into preallocated column buffers, so the full
+    body and the dictionary of every bar are never held in memory together.
+    Responses without a time series (errors, sector performances, exchange
+    rates) are kept as text to be decoded as usual.
+    """
+
+    def __init__(self, window=65536, schema=None, loads=json.loads):
+        """ Initialize the parser
+
+        Keyword Arguments:
+            window:  Amount of characters of bars decoded at once
+                (default 65536)
+            schema:  The Schema of the api function, the bars are checked
+                against it (default None)
+            loads:  The function decoding json text, see
+                alpha_vantage.decoders (default json.loads)
+        """
+        self.window = window
+        self.schema = schema
+        self.loads = loads
+        # The body while no series was found, afterwards the bars not
+        # decoded yet
+        self.text = ''
+        self.series_key = None
+        self._pos = 0
+        self._decoder = codecs.getincrementaldecoder('utf-8')()
+        self._head = None
+        self._tail = None
+        self._index = []
+        self._buffers = None
+
+    def feed(self, chunk):
+        """ Parse the next chunk of the body
+
+        Keyword Arguments:
+            chunk:  Bytes (or text) of the body
+        """
+        if isinstance(chunk, bytes):
+            chunk = self._decoder.decode(chunk)
+        if self._tail is not None:
+            self._tail += chunk
+            return
+        self.text = self.text[self._pos:] + chunk
+        self._pos = 0
+        if self.series_key is None:
+            match = _SERIES_START.search(self.text)
+            if match is None:
+                return
+            self.series_key = match.group(1)
+            self._head = self.text[:match.start()]
+            self._pos = match.start(2)
+        self._parse()
+
+    def _parse(self, final=False):
+        """ Decode the pending bars window by window, keeping the last
+        incomplete one for the next chunk
+        """
+        text = self.text
+        while True:
+            pos = _SEPARATORS.match(text, self._pos).end()
+            self._pos = pos
+            if text.startswith('}', pos):
+                # End of the series
+                self._tail = text[pos + 1:]
+                self.text = ''
+                self._pos = 0
+                return
+            end = pos + self.window
+            series_end = _SERIES_END.search(text, pos, end)
+            if series_end is not None:
+                cut = series_end.start() + 1
+            elif len(text) < end and not final:
+                # Wait for a full window
+                return
+            else:
+                # A bar longer than the window is decoded alone
+                cut = text.rfind('}', pos, end) + 1 or text.find('}', pos) + 1
+                if not cut:
+                    return
+            self._add_bars(text[pos:cut])
+            self._pos = cut
+
+    def _add_bars(self, text):
+        """ Decode a window of complete bars into the column buffers
+        """
+        bars = self.loads('{' + text + '}')
+        if not bars:
+            return
+        if self._buffers is None:
+            columns = list(next(iter(bars.values())))
+            if self.schema is not None and self.schema.check(columns):
+                columns = list(self.schema.columns)
+            self._buffers = _ColumnBuffers(columns, max(len(bars), 1024))
+        columns = self._buffers.columns
+        values = [value for bar in bars.values() for value in bar.values()]
+        if len(values) != len(bars) * len(columns) or any(
+                len(bar) != len(columns) for bar in bars.values()):
+            # Some bars miss fields or have new ones
+            for bar in bars.values():
+                for column in bar:
+                    if column not in columns:
+                        self._buffers.add_column(column)
+            values = [bar.get(column, 'nan') for bar in bars.values()
+                      for column in columns]
+        self._buffers.append(numpy.array(values, dtype=float).reshape(
+            len(bars), len(columns)))
+        self._index.extend(bars)
+
+    def close(self):
+        """ Return the parsed response once all the body was given: a
+        dictionary with the other keys of the response and SeriesColumns for
+        the time series. It returns None if the response has no time series,
+        the body is then left in the text attribute. It raises ValueError if
+        the body is incomplete.
+        """
+        self.feed(self._decoder.decode(b'', final=True))
+        if self.series_key is None:
+            return None
+        if self._tail is None:
+            self._parse(final=True)
+            if self._tail is None:
+                raise ValueError('The time series of the response is '
+                                 'incomplete')
+        response = self.loads(self._head.rstrip().rstrip(',') + '}')
+        tail = self._tail.strip()
+        if tail.startswith(','):
+            # More keys after the series
+            response.update(self.loads('{' + tail[1:]))
+        elif tail != '}':
+            raise ValueError('The response ends with unexpected data')
+        if self._buffers is None:
+            series = SeriesColumns([], [], numpy.empty((0, 0)))
+        else:
+            series = SeriesColumns(self._index, self._buffers.columns,
+                                   self._buffers.values())
+        response[self.series_key] = series
+        return response
+
+
+def parse_series(body, schema=None, loads=json.loads):
+    """ Parse a whole response body with a SeriesParser, returning None if it
+    has no time series
+
+    Keyword Arguments:
+        body:  The body of the api response
+        schema:  The Schema of the api function (default None)
+        loads:  The function decoding json text (default json.loads)
+    """
+    parser = SeriesParser(schema=schema, loads=loads)
+    parser.feed(body)
+    return parser.close()
@@ -0,0 +1,55 @@
+#!/usr/bin/env python
+import threading
+
+
+class _Call(object):
+    """ A call in flight, that the callers arriving later wait for
+    """
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SingleFlight(object):
+    """ Coalesce identical api calls made at the same time from several
+    threads: while a call is in flight, the callers asking for the same
+    request wait for it and share its parsed result instead of sending it
+    again. Give the same instance to several clients to coalesce their calls
+    too. Note that the callers get the very same result object, so it should
+    not be modified in place.
+    """
+
+    def __init__(self):
+        self._calls = {}
+        self._lock = threading.Lock()
+
+    def do(self, key, func, *args):
+        """ Return func(*args), or the result of the call with the same key
+        already in flight. The error of the call is raised to all its callers.
+
+        Keyword Arguments:
+            key:  The normalized request of the call
+            func:  The function doing the call
+            args:  The arguments for func
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+        if leader:
+            try:
+                call.result = func(*args)
+            except Exception as err:
+                call.error = err
+            finally:
+                with self._lock:
+                    del self._calls[key]
+                call.done.set()
+        else:
+            call.done.wait()
+        if call.error is not None:
+            raise call.error
+        return call.result
@@ -0,0 +1,278 @@
+#!/usr/bin/env python
+import csv
+import io
+import sqlite3
+import sys
+import threading
+import time
+import urllib
+try:
+    # urllib.request is not loaded by importing urllib alone in python 3
+    import urllib.request
+except ImportError:
+    pass
+from .alphavantage import AlphaVantage
+from .errors import InvalidRequestError
+
+# Parameters of the calls holding a symbol, by api function prefix, with the
+# kinds of symbols they accept
+_SYMBOL_PARAMETERS = (
+    ('DIGITAL_CURRENCY_', (('symbol', ('digital',)),
+                           ('market', ('physical',)))),
+    ('CURRENCY_EXCHANGE_RATE', (('from_currency', ('physical', 'digital')),
+                                ('to_currency', ('physical', 'digital')))),
+    ('SECTOR', ()),
+    ('', (('symbol', ('equity',)),)),
+)
+
+
+class SymbolDirectory(object):
+    """ Local directory of the symbols accepted by the api, kept in a SQLite
+    database file, to reject the calls with unknown symbols before they are
+    sent. The digital and physical currencies are checked against the lists
+    published by Alpha Vantage, downloaded once in a while. The equities are
+    learned from the calls: a symbol the api rejected is rejected locally
+    during invalid_ttl seconds, unless it was seen valid before. The api
+    rejects an invalid interval the same way as an invalid symbol, so a
+    symbol is only learned as invalid when the same call (the same function
+    and other parameters) was answered before for another symbol.
+    """
+
+    def __init__(self, path, invalid_ttl=86400, list_ttl=7 * 86400,
+                 transport=None, timeout=30):
+        """ Initialize the directory, creating the database if needed
+
+        Keyword Arguments:
+            path:  Path of the database file
+            invalid_ttl:  Seconds an equity symbol rejected by the api is
+                rejected locally (default one day)
+            list_ttl:  Seconds before the currency lists are downloaded
+                again (default one week)
+            transport:  Object used to download the currency lists, like a
+                ConnectionPool. If None, urllib is used (default None)
+            timeout:  Seconds to wait for the lock of the database (default 30)
+        """
+        self.path = path
+        self.invalid_ttl = invalid_ttl
+        self.list_ttl = list_ttl
+        self.transport = transport
+        self.timeout = timeout
+        self._lists = {}
+        self._lock = threading.Lock()
+        connection = self._connect()
+        try:
+            connection.execute('CREATE TABLE IF NOT EXISTS symbols '
+                               '(kind TEXT, symbol TEXT, valid INTEGER, '
+                               'updated REAL, PRIMARY KEY (kind, symbol))')
+            connection.execute('CREATE TABLE IF NOT EXISTS lists '
+                               '(kind TEXT PRIMARY KEY, updated REAL)')
+            # The calls answered by the api, without their equity symbols
+            connection.execute('CREATE TABLE IF NOT EXISTS answered '
+                               '(call TEXT PRIMARY KEY, updated REAL)')
+        finally:
+            connection.close()
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=self.timeout,
+                               isolation_level=None)
+
+    def check(self, key):
+        """ Raise InvalidRequestError if a symbol of the call is known to be
+        invalid, before the call is sent.
+
+        Keyword Arguments:
+            key:  The url of the call without its api key
+        """
+        for parameter, symbol, kinds in _symbols(key):
+            if 'equity' in kinds:
+                if self._equity(symbol) is False:
+                    raise InvalidRequestError(
+                        'The symbol {} was rejected by the api, it is '
+                        'rejected locally until it expires'.format(symbol))
+                continue
+            known = [self.currencies(kind) for kind in kinds]
+            if any(currencies is None for currencies in known):
+                # A list could not be downloaded, let the api decide
+                continue
+            if not any(symbol in currencies for currencies in known):
+                raise InvalidRequestError(
+                    'Unknown currency {} for the parameter {}'.format(
+                        symbol, parameter))
+
+    def record(self, key, valid):
+        """ Learn the equity symbols of a call from its outcome
+
+        Keyword Arguments:
+            key:  The url of the call without its api key
+            valid:  Whether the api answered the call or rejected it as an
+                invalid request
+        """
+        symbols = [symbol for _, symbol, kinds in _symbols(key)
+                   if 'equity' in kinds]
+        if not symbols:
+            return
+        call = _without_symbols(key)
+        connection = self._connect()
+        try:
+            if valid:
+                connection.execute('INSERT OR REPLACE INTO answered '
+                                   '(call, updated) VALUES (?, ?)',
+                                   (call, time.time()))
+            elif connection.execute('SELECT 1 FROM answered WHERE call = ?',
+                                    (call,)).fetchone() is None:
+                # The api may have rejected another parameter of the call
+                return
+            for symbol in symbols:
+                known = self._equity(symbol)
+                if known is True or known is valid:
+                    # A symbol seen valid once is not rejected later on
+                    continue
+                connection.execute('INSERT OR REPLACE INTO symbols '
+                                   '(kind, symbol, valid, updated) VALUES '
+                                   '(?, ?, ?, ?)', ('equity', symbol,
+                                                    int(valid), time.time()))
+        finally:
+            connection.close()
+
+    def _equity(self, symbol):
+        """ Return True if the equity symbol was seen valid, False if it was
+        rejected by the api and that did not expire yet, else None
+        """
+        connection = self._connect()
+        try:
+            row = connection.execute('SELECT valid, updated FROM symbols '
+                                     'WHERE kind = ? AND symbol = ?',
+                                     ('equity', symbol)).fetchone()
+        finally:
+            connection.close()
+        if row is None:
+            return None
+        valid, updated = row
+        if valid:
+            return True
+        if updated + self.invalid_ttl > time.time():
+            return False
+        return None
+
+    def currencies(self, kind):
+        """ Return the set of the codes of the 'digital' or 'physical'
+        currencies, downloading their list when it expired. It returns None
+        if the list is not known and could not be downloaded.
+
+        Keyword Arguments:
+            kind:  Either 'digital' or 'physical'
+        """
+        with self._lock:
+            currencies, loaded = self._lists.get(kind, (None, None))
+            if loaded is not None and loaded + self.list_ttl > time.time():
+                return currencies
+            currencies = self._load_list(kind)
+            self._lists[kind] = (currencies, time.time())
+            return currencies
+
+    def _load_list(self, kind):
+        """ Return the currency list from the database, downloading it again
+        if it expired.
+        """
+        connection = self._connect()
+        try:
+            row = connection.execute('SELECT updated FROM lists WHERE '
+                                     'kind = ?', (kind,)).fetchone()
+            if row is None or row[0] + self.list_ttl <= time.time():
+                try:
+                    codes = self._download(kind)
+                except Exception:
+                    codes = None
+                if codes:
+                    self._store_list(connection, kind, codes)
+                    return codes
+                elif row is None:
+                    return None
+                # Keep using the expired list until the download works
+            return set(symbol for symbol, in connection.execute(
+                'SELECT symbol FROM symbols WHERE kind = ?', (kind,)))
+        finally:
+            connection.close()
+
+    def _store_list(self, connection, kind, codes):
+        """ Replace the stored currency list of the given kind
+        """
+        try:
+            connection.execute('BEGIN IMMEDIATE')
+            connection.execute('DELETE FROM symbols WHERE kind = ?', (kind,))
+            connection.executemany('INSERT INTO symbols (kind, symbol, '
+                                   'valid, updated) VALUES (?, ?, 1, ?)',
+                                   [(kind, code, time.time())
+                                    for code in codes])
+            connection.execute('INSERT OR REPLACE INTO lists (kind, updated) '
+                               'VALUES (?, ?)', (kind, time.time()))
+            connection.execute('COMMIT')
+        except Exception:
+            connection.rollback()
+            raise
+
+    def _download(self, kind):
+        """ Download the csv list of the currencies of the given kind,
+        returning the set of their codes.
+        """
+        if kind == 'digital':
+            url = AlphaVantage._ALPHA_VANTAGE_DIGITAL_CURRENCY_LIST
+        else:
+            url = AlphaVantage._ALPHA_VANTAGE_PHYSICAL_CURRENCY_LIST
+        if self.transport is not None:
+            response = self.transport.urlopen(url)
+        # In order to keep supporting python 2.7, we have to do this.
+        elif sys.version_info.major == 3:
+            response = urllib.request.urlopen(url)
+        else:
+            response = urllib.urlopen(url)
+        try:
+            body = response.read()
+        finally:
+            response.close()
+        if isinstance(body, bytes):
+            body = body.decode('utf-8')
+        rows = csv.reader(io.StringIO(body))
+        # The first row is the header
+        next(rows, None)
+        return set(row[0].strip().upper() for row in rows if row)
+
+
+def _parameters(key):
+    """ Return the dictionary of the parameters of a call
+    """
+    return dict(parameter.split('=', 1)
+                for parameter in key.split('?', 1)[-1].split('&')
+                if '=' in parameter)
+
+
+def _without_symbols(key):
+    """ Return the parameters of a call other than its equity symbols, in
+    a canonical order. Two calls only differing by their symbols give the
+    same one.
+
+    Keyword Arguments:
+        key:  The url of the call without its api key
+    """
+    symbols = set(parameter for parameter, _, kinds in _symbols(key)
+                  if 'equity' in kinds)
+    return '&'.join(sorted('{}={}'.format(parameter, value)
+                           for parameter, value in _parameters(key).items()
+                           if parameter not in symbols))
+
+
+def _symbols(key):
+    """ Yield the (parameter, symbol, kinds) of the symbols in a call
+
+    Keyword Arguments:
+        key:  The url of the call without its api key
+    """
+    parameters = _parameters(key)
+    function = parameters.get('function', '').upper()
+    for prefix, symbol_parameters in _SYMBOL_PARAMETERS:
+        if function.startswith(prefix):
+            break
+    for parameter, kinds in symbol_parameters:
+        symbol = parameters.get(parameter)
+        if symbol:
+            yield parameter, symbol.upper(), kinds
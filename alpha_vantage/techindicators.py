@@ -14,6 +14,9 @@ class TechIndicators(av):
         if self.output_format.lower() == 'csv':
             raise ValueError("Output format {} is not comatible with the TechIndicators class".format(
                 self.output_format.lower()))
+        if self.datatype == 'csv':
+            raise ValueError("Data type csv is not compatible with the "
+                             "TechIndicators class")
 
     @av._output_format
     @av._call_api_on_func
@@ -0,0 +1,165 @@
+#!/usr/bin/env python
+import threading
+import zlib
+
+# Content encodings the api responses can be decompressed from
+ACCEPT_ENCODING = 'gzip, deflate'
+
+
+class TransferStats(object):
+    """ Thread safe counters of the bytes transferred by the api calls, before
+    (wire_bytes) and after (decoded_bytes) decompression. Give the same
+    instance to several clients to monitor them together.
+    """
+
+    def __init__(self):
+        self.responses = 0
+        self.wire_bytes = 0
+        self.decoded_bytes = 0
+        self._lock = threading.Lock()
+
+    def add(self, wire_bytes, decoded_bytes):
+        """ Count a response
+
+        Keyword Arguments:
+            wire_bytes:  Size of the body as it was received
+            decoded_bytes:  Size of the body once decompressed
+        """
+        with self._lock:
+            self.responses += 1
+            self.wire_bytes += wire_bytes
+            self.decoded_bytes += decoded_bytes
+
+    @property
+    def compression_ratio(self):
+        """ Decoded bytes per byte received, 1.0 when nothing was compressed
+        """
+        if not self.wire_bytes:
+            return 1.0
+        return float(self.decoded_bytes) / self.wire_bytes
+
+
+def content_encoding(response):
+    """ Return the Content-Encoding of a response (lower case), or None if it
+    has none or its headers are not available.
+
+    Keyword Arguments:
+        response:  The file like response of the api call
+    """
+    info = getattr(response, 'info', None)
+    headers = info() if callable(info) else getattr(response, 'headers', None)
+    if headers is None:
+        return None
+    encoding = headers.get('Content-Encoding')
+    return encoding.strip().lower() if encoding else None
+
+
+class ResponseDecoder(object):
+    """ Incremental decoder of a response body for its content encoding, that
+    counts the bytes before and after decompression.
+    """
+
+    def __init__(self, encoding=None, stats=None):
+        """ Initialize the decoder
+
+        Keyword Arguments:
+            encoding:  The Content-Encoding of the response, the body is
+                given back untouched unless it is 'gzip' or 'deflate'
+                (default None)
+            stats:  TransferStats that counts the response once it was
+                completely decoded (default None)
+        """
+        self.encoding = encoding
+        self.stats = stats
+        self.wire_bytes = 0
+        self.decoded_bytes = 0
+        if encoding in ('gzip', 'deflate'):
+            # Automatic detection of the gzip and zlib headers
+            self._decompressor = zlib.decompressobj(32 + zlib.MAX_WBITS)
+        else:
+            self._decompressor = None
+
+    def decode(self, chunk):
+        """ Decode the next chunk of the body
+
+        Keyword Arguments:
+            chunk:  The bytes of the body as received
+        """
+        self.wire_bytes += len(chunk)
+        if self._decompressor is None:
+            data = chunk
+        else:
+            try:
+                data = self._decompressor.decompress(chunk)
+            except zlib.error:
+                if self.encoding != 'deflate' or self.wire_bytes > len(chunk):
+                    raise
+                # Some servers send raw deflate data without zlib header
+                self._decompressor = zlib.decompressobj(-zlib.MAX_WBITS)
+                data = self._decompressor.decompress(chunk)
+        self.decoded_bytes += len(data)
+        return data
+
+    def flush(self):
+        """ Return the rest of the decoded body once all the chunks were
+        given, counting the response in the stats.
+        """
+        data = self._decompressor.flush() if self._decompressor else b''
+        self.decoded_bytes += len(data)
+        if self.stats is not None:
+            self.stats.add(self.wire_bytes, self.decoded_bytes)
+        return data
+
+
+class DecodedResponse(object):
+    """ File like wrapper of a response that decompresses its body
+    incrementally while it is read.
+    """
+
+    def __init__(self, response, stats=None, chunk_size=65536):
+        """ Initialize the wrapper
+
+        Keyword Arguments:
+            response:  The file like response of the api call
+            stats:  TransferStats counting the response (default None)
+            chunk_size:  Amount of bytes read from the response at once
+                (default 65536)
+        """
+        self._response = response
+        self._decoder = ResponseDecoder(content_encoding(response), stats)
+        self._chunk_size = chunk_size
+        self._buffer = b''
+        self._done = False
+
+    def _read_chunk(self):
+        chunk = self._response.read(self._chunk_size)
+        if not chunk:
+            self._done = True
+            return self._decoder.flush()
+        return self._decoder.decode(chunk)
+
+    def read(self, amt=None):
+        """ Read the decoded body, or at most amt bytes of it.
+
+        Keyword Arguments:
+            amt:  Maximum amount of bytes to read, None reads everything
+        """
+        chunks = [self._buffer] if self._buffer else []
+        size = len(self._buffer)
+        while not self._done and (amt is None or size < amt):
+            chunk = self._read_chunk()
+            if chunk:
+                chunks.append(chunk)
+                size += len(chunk)
+        # Responses opened in text mode (like files) give str chunks
+        data = chunks[0][:0].join(chunks) if chunks else b''
+        if amt is None:
+            self._buffer = b''
+            return data
+        self._buffer = data[amt:]
+        return data[:amt]
+
+    def close(self):
+        """ Close the underlying response
+        """
+        self._response.close()
@@ -0,0 +1,80 @@
+#!/usr/bin/env python
+""" Compare the per request latency of the default urllib transport (a new
+connection per call) against a shared keep-alive ConnectionPool, using a local
+stub server that answers every call with the intraday test data.
+
+Usage:
+    python benchmarks/bench_connectionpool.py [requests]
+"""
+import os
+import sys
+import threading
+import timeit
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, _ROOT)
+
+from alpha_vantage.alphavantage import AlphaVantage  # noqa: E402
+from alpha_vantage.connectionpool import ConnectionPool  # noqa: E402
+from alpha_vantage.timeseries import TimeSeries  # noqa: E402
+
+_FIXTURE = os.path.join(
+    _ROOT, 'test_alpha_vantage', 'test_data',
+    'https___www_alphavantage_co_query_function_TIME_SERIES_INTRADAY_symbol_'
+    'MSFT_interval_1min_apikey_test')
+
+
+class _StubHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    # Headers and body are written separately, avoid Nagle delaying the body
+    disable_nagle_algorithm = True
+
+    with open(_FIXTURE, 'rb') as f:
+        body = f.read()
+
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(self.body)))
+        self.end_headers()
+        self.wfile.write(self.body)
+
+    def log_message(self, *args):
+        pass
+
+
+class _StubServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+def _per_request(ts, requests):
+    stime = timeit.default_timer()
+    for _ in range(requests):
+        ts.get_intraday('MSFT', interval='1min')
+    return (timeit.default_timer() - stime) / requests
+
+
+def main(requests=500):
+    server = _StubServer(('127.0.0.1', 0), _StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    AlphaVantage._ALPHA_VANTAGE_API_URL = 'http://127.0.0.1:{}/query?'.format(
+        server.server_address[1])
+    pool = ConnectionPool()
+    urllib_latency = _per_request(TimeSeries(key='test'), requests)
+    pool_latency = _per_request(TimeSeries(key='test', transport=pool),
+                                requests)
+    pool.close()
+    server.shutdown()
+    print('requests: {}'.format(requests))
+    print('urllib (new connection): {:.3f} ms/request'.format(
+        urllib_latency * 1000))
+    print('ConnectionPool (keep-alive): {:.3f} ms/request'.format(
+        pool_latency * 1000))
+    print('saved: {:.3f} ms/request'.format(
+        (urllib_latency - pool_latency) * 1000))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
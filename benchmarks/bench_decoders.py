@@ -0,0 +1,51 @@
+#!/usr/bin/env python
+""" Decode the json responses of the test data with every json decoder
+installed and report the time spent per round, the fastest first. The
+automatic choice of the clients should be the first one.
+
+Usage:
+    python benchmarks/bench_decoders.py [rounds]
+"""
+import os
+import sys
+import timeit
+
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, _ROOT)
+
+from alpha_vantage.decoders import available_decoders  # noqa: E402
+from alpha_vantage.decoders import get_decoder  # noqa: E402
+
+_TEST_DATA = os.path.join(_ROOT, 'test_alpha_vantage', 'test_data')
+
+
+def _bodies():
+    bodies = []
+    for name in sorted(os.listdir(_TEST_DATA)):
+        with open(os.path.join(_TEST_DATA, name), 'rb') as body:
+            body = body.read()
+        if body.lstrip()[:1] == b'{':
+            bodies.append(body)
+    return bodies
+
+
+def main(rounds=100):
+    bodies = _bodies()
+    timings = []
+    for name in available_decoders():
+        loads = get_decoder(name)
+        timing = min(timeit.repeat(
+            lambda: [loads(body) for body in bodies], number=int(rounds),
+            repeat=5)) / int(rounds)
+        timings.append((timing, name))
+    print('responses: {} ({} bytes)'.format(
+        len(bodies), sum(len(body) for body in bodies)))
+    for timing, name in sorted(timings):
+        print('{:10} {:.3f} ms/round'.format(name, timing * 1000))
+    print('automatic choice: {}'.format(
+        next(name for name in available_decoders()
+             if get_decoder(name) is get_decoder())))
+
+
+if __name__ == '__main__':
+    main(*sys.argv[1:])
@@ -0,0 +1,54 @@
+#!/usr/bin/env python
+""" Import the clients in fresh interpreters and report the time it takes,
+along with the heavy optional dependencies imported with them (none are
+expected, pandas and numpy are only imported once an output needs them).
+
+Usage:
+    python benchmarks/bench_import.py [rounds] [max_ms]
+
+With max_ms, it exits with an error when the median import time is above
+it or when a heavy dependency was imported, to guard the startup time.
+"""
+import os
+import subprocess
+import sys
+
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_STATEMENT = 'from alpha_vantage.timeseries import TimeSeries'
+_HEAVY = ('pandas', 'numpy', 'simplejson', 'orjson', 'ujson', 'aiohttp')
+_CODE = '''
+import sys
+import timeit
+stime = timeit.default_timer()
+{}
+print(timeit.default_timer() - stime)
+print(' '.join(name for name in {!r} if name in sys.modules))
+'''.format(_STATEMENT, _HEAVY)
+
+
+def _import():
+    output = subprocess.check_output([sys.executable, '-c', _CODE],
+                                     cwd=_ROOT).decode('utf-8')
+    timing, heavy = (output.split('\n') + [''])[:2]
+    return float(timing), heavy.split()
+
+
+def main(rounds=20, max_ms=None):
+    timings = []
+    heavy = set()
+    for _ in range(int(rounds)):
+        timing, imported = _import()
+        timings.append(timing)
+        heavy.update(imported)
+    median = sorted(timings)[len(timings) // 2] * 1000
+    print('{}: {:.1f} ms median, {:.1f} ms min'.format(
+        _STATEMENT, median, min(timings) * 1000))
+    print('heavy imports: {}'.format(', '.join(sorted(heavy)) or 'none'))
+    if max_ms is not None and (median > float(max_ms) or heavy):
+        sys.exit('The import is slower than {} ms or imports {}'.format(
+            max_ms, ', '.join(sorted(heavy))))
+
+
+if __name__ == '__main__':
+    main(*sys.argv[1:])
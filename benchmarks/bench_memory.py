@@ -0,0 +1,48 @@
+#!/usr/bin/env python
+""" Load the intraday test data for many symbols in every compact mode and
+report the memory the resulting panel, with a categorical symbol column,
+holds per mode. No network access is needed.
+
+Usage:
+    python benchmarks/bench_memory.py [symbols]
+"""
+import os
+import sys
+
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, _ROOT)
+
+from alpha_vantage.compact import COMPACT_MODES  # noqa: E402
+from alpha_vantage.compact import concat_symbols, memory_usage  # noqa: E402
+from alpha_vantage.timeseries import TimeSeries  # noqa: E402
+
+_FIXTURE = os.path.join(
+    _ROOT, 'test_alpha_vantage', 'test_data',
+    'https___www_alphavantage_co_query_function_TIME_SERIES_INTRADAY_symbol_'
+    'MSFT_interval_1min_apikey_test')
+
+
+class _FixtureTransport(object):
+    """ Answer every call with the intraday test data
+    """
+
+    def urlopen(self, url, headers=None, timeout=None):
+        return open(_FIXTURE, 'rb')
+
+
+def main(symbols=1000):
+    symbols = ['S{}'.format(i) for i in range(int(symbols))]
+    print('mode      rows      MB  bytes/row')
+    for mode in COMPACT_MODES:
+        ts = TimeSeries(key='test', output_format='pandas', compact=mode,
+                        transport=_FixtureTransport())
+        panel = concat_symbols(
+            (symbol, ts.get_intraday(symbol, interval='1min')[0])
+            for symbol in symbols)
+        usage = memory_usage(panel)
+        print('{:8} {:>6} {:>7.2f} {:>10.1f}'.format(
+            str(mode), len(panel), usage / 1e6, usage / float(len(panel))))
+
+
+if __name__ == '__main__':
+    main(*sys.argv[1:])
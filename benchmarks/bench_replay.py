@@ -0,0 +1,78 @@
+#!/usr/bin/env python
+""" Replay the calls recorded in an archive of a RecordingTransport through
+the client, with no network access, and report the time spent per call to
+decode the responses and to build their data frames. Without an archive, one
+is recorded from the intraday test data.
+
+Usage:
+    python benchmarks/bench_replay.py [archive] [rounds]
+"""
+import os
+import shutil
+import sys
+import tempfile
+import timeit
+
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, _ROOT)
+
+from alpha_vantage.alphavantage import AlphaVantage  # noqa: E402
+from alpha_vantage.replay import RecordingTransport  # noqa: E402
+from alpha_vantage.replay import ReplayTransport  # noqa: E402
+from alpha_vantage.timeseries import TimeSeries  # noqa: E402
+
+_FIXTURE = os.path.join(
+    _ROOT, 'test_alpha_vantage', 'test_data',
+    'https___www_alphavantage_co_query_function_TIME_SERIES_INTRADAY_symbol_'
+    'MSFT_interval_1min_apikey_test')
+
+
+class _FixtureTransport(object):
+    """ Answer every call with the intraday test data
+    """
+
+    def urlopen(self, url, headers=None, timeout=None):
+        return open(_FIXTURE, 'rb')
+
+
+def _record(path):
+    recorder = RecordingTransport(path, transport=_FixtureTransport())
+    TimeSeries(key='test', transport=recorder).get_intraday(
+        'MSFT', interval='1min')
+
+
+def _per_call(client, urls, rounds, pandas):
+    stime = timeit.default_timer()
+    for _ in range(rounds):
+        client.transport.rewind()
+        for url in urls:
+            response = client._handle_api_call(url)
+            if pandas:
+                data_key = next(key for key in response if key != 'Meta Data')
+                client._data_frame(response[data_key])
+    return (timeit.default_timer() - stime) / (rounds * len(urls))
+
+
+def main(archive=None, rounds=200):
+    tmp_dir = None
+    if archive is None:
+        tmp_dir = tempfile.mkdtemp()
+        archive = os.path.join(tmp_dir, 'archive')
+        _record(archive)
+    try:
+        replay = ReplayTransport(archive)
+        client = AlphaVantage(key='replay', transport=replay)
+        urls = replay.urls()
+        json_latency = _per_call(client, urls, int(rounds), False)
+        pandas_latency = _per_call(client, urls, int(rounds), True)
+        replay.close()
+    finally:
+        if tmp_dir is not None:
+            shutil.rmtree(tmp_dir)
+    print('calls: {} x {} rounds'.format(len(urls), rounds))
+    print('json: {:.3f} ms/call'.format(json_latency * 1000))
+    print('pandas: {:.3f} ms/call'.format(pandas_latency * 1000))
+
+
+if __name__ == '__main__':
+    main(*sys.argv[1:])
@@ -29,14 +29,17 @@ setup(
     ],
     url='https://github.com/RomelTorres/alpha_vantage',
     install_requires=[
-        'simplejson',
+        'futures; python_version < "3"',
     ],
     test_requires=[
         'nose',
-        'simplejson'
     ],
     extras_requires={
         'pandas': ['pandas'],
+        'async': ['aiohttp'],
+        'orjson': ['orjson'],
+        'ujson': ['ujson'],
+        'simplejson': ['simplejson'],
     },
     keywords=['stocks', 'market', 'finance', 'alpha_vantage', 'quotes',
               'shares'],
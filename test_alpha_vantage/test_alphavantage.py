@@ -4,12 +4,46 @@ from ..alpha_vantage.techindicators import TechIndicators
 from ..alpha_vantage.sectorperformance import SectorPerformances
 from ..alpha_vantage.cryptocurrencies import CryptoCurrencies
 from ..alpha_vantage.foreignexchange import ForeignExchange
+from ..alpha_vantage.connectionpool import ConnectionPool
+from ..alpha_vantage.ratelimiter import RateLimiter, SQLiteBackend
+from ..alpha_vantage.retrypolicy import RetryPolicy
+from ..alpha_vantage.decoders import available_decoders, get_decoder
+from ..alpha_vantage.errors import InvalidRequestError
+from ..alpha_vantage.singleflight import SingleFlight
+from ..alpha_vantage.keypool import KeyPool
+from ..alpha_vantage.cache import DiskCache, ResultCache
+from ..alpha_vantage.history import HistoryStore
+from ..alpha_vantage.compact import (COMPACT_MODES, concat_symbols,
+                                     memory_by_mode, memory_usage)
+from ..alpha_vantage.columnstore import ColumnStore
+from ..alpha_vantage.lazy import module_found
+from ..alpha_vantage.symbols import SymbolDirectory
+from ..alpha_vantage.replay import RecordingTransport, ReplayTransport
+from ..alpha_vantage.schemas import SchemaDriftWarning, normalize_name
+from ..alpha_vantage.seriesparser import SeriesParser
 from pandas import DataFrame as df
+from pandas import DatetimeIndex
+import numpy
 import unittest
 import mock
+from contextlib import contextmanager
 import sys
+import os
 from os import path
+import io
+import json
+import shutil
+import socket
+import subprocess
+import tempfile
+import threading
+import time
 import urllib
+import warnings
+try:
+    from urllib.error import HTTPError
+except ImportError:
+    from urllib2 import HTTPError
 
 
 class TestAlphaVantage(unittest.TestCase):
@@ -143,7 +177,9 @@ class TestAlphaVantage(unittest.TestCase):
             mock_urlopen.return_value = f
             data, _ = ts.get_intraday(
                 "MSFT", interval='1min', outputsize='full')
-            assert type(data.index[0]) == str
+            assert isinstance(data.index, DatetimeIndex)
+            assert str(data.index.tz) == 'US/Eastern'
+            assert data.index.is_monotonic_increasing
 
     @unittest.skipIf(sys.version_info.major == 3, "Test valid for python 2")
     @mock.patch('urllib.urlopen')
@@ -158,7 +194,9 @@ class TestAlphaVantage(unittest.TestCase):
             mock_urlopen.return_value = f
             data, _ = ts.get_intraday(
                 "MSFT", interval='1min', outputsize='full')
-            assert type(data.index[0]) == str
+            assert isinstance(data.index, DatetimeIndex)
+            assert str(data.index.tz) == 'US/Eastern'
+            assert data.index.is_monotonic_increasing
 
     @unittest.skipIf(sys.version_info.major == 2, "Test valid for python 3")
     @mock.patch('urllib.request.urlopen')
@@ -295,6 +333,24 @@ class TestAlphaVantage(unittest.TestCase):
             self.assertIsInstance(
                 data, df, 'Result Data must be a pandas data frame')
 
+    @unittest.skipIf(sys.version_info.major == 2, "Test valid for python 3")
+    @mock.patch('urllib.request.urlopen')
+    def test_sector_perfomance_normalized_columns(self, mock_urlopen):
+        """ Test that the columns of the sector data frame are normalized
+        like the ones of the other functions when asked to
+        """
+        sp = SectorPerformances(key=TestAlphaVantage._API_KEY_TEST,
+                                output_format='pandas',
+                                normalize_columns=True)
+        url = "https://www.alphavantage.co/query?function=SECTOR&apikey=test"
+        with open(self.get_file_from_url(url)) as f:
+            mock_urlopen.return_value = f
+            data, _ = sp.get_sector()
+        self.assertIn('rank_a_real_time_performance', data.columns)
+        self.assertIn('rank_f_year_to_date_ytd_performance', data.columns)
+        self.assertFalse([column for column in data.columns
+                          if column != normalize_name(column)])
+
     @unittest.skipIf(sys.version_info.major == 3, "Test valid for python 2.7")
     @mock.patch('urllib.urlopen')
     def test_sector_perfomance_pandas_python2(self, mock_urlopen):
@@ -401,3 +457,1007 @@ class TestAlphaVantage(unittest.TestCase):
                 symbol='BTC', market='CNY')
             self.assertIsInstance(
                 data, df, 'Result Data must be a pandas data frame')
+
+    @contextmanager
+    def serve_file_from_url(self, url, statuses=()):
+        """ Serve the test data of the given url with a local http server,
+        yielding the api url to use and the list of accepted connections.
+        The first requests are answered with the given error statuses and an
+        html page.
+        """
+        from http.server import BaseHTTPRequestHandler, HTTPServer
+        with open(self.get_file_from_url(url), 'rb') as f:
+            body = f.read()
+        connections = []
+        statuses = list(statuses)
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def setup(self):
+                connections.append(self.client_address)
+                BaseHTTPRequestHandler.setup(self)
+
+            def do_GET(self):
+                status = statuses.pop(0) if statuses else 200
+                page = body if status == 200 else \
+                    b'<html><body>Server error</body></html>'
+                self.send_response(status)
+                self.send_header('Content-Length', str(len(page)))
+                self.end_headers()
+                self.wfile.write(page)
+
+            def log_message(self, *args):
+                pass
+
+        server = HTTPServer(('127.0.0.1', 0), Handler)
+        thread = threading.Thread(target=server.serve_forever)
+        thread.start()
+        api_url = 'http://127.0.0.1:{}/query?'.format(server.server_address[1])
+        try:
+            with mock.patch.object(AlphaVantage, '_ALPHA_VANTAGE_API_URL',
+                                   api_url):
+                yield connections
+        finally:
+            server.shutdown()
+            server.server_close()
+            thread.join()
+
+    @unittest.skipIf(sys.version_info.major == 2, "Test valid for python 3")
+    def test_connection_pool_keep_alive(self):
+        """ Test that instances sharing a connection pool reuse a single
+        keep-alive connection
+        """
+        url = "https://www.alphavantage.co/query?function=TIME_SERIES_INTRADAY&symbol=MSFT&interval=1min&apikey=test"
+        pool = ConnectionPool(connect_timeout=5, read_timeout=5)
+        with self.serve_file_from_url(url) as connections:
+            try:
+                for _ in range(2):
+                    ts = TimeSeries(key=TestAlphaVantage._API_KEY_TEST,
+                                    transport=pool)
+                    data, _ = ts.get_intraday("MSFT", interval='1min')
+                    self.assertIsInstance(
+                        data, dict, 'Result Data must be a dictionary')
+            finally:
+                pool.close()
+        self.assertEqual(len(connections), 1)
+
+    @unittest.skipIf(sys.version_info < (3, 5), "Test valid for python 3.5+")
+    def test_async_time_series_intraday_pandas(self):
+        """ Test that the asynchronous client returns the same format as the
+        synchronous one
+        """
+        import asyncio
+        from ..alpha_vantage.async_support.timeseries import AsyncTimeSeries
+        url = "https://www.alphavantage.co/query?function=TIME_SERIES_INTRADAY&symbol=MSFT&interval=1min&apikey=test"
+
+        async def get_intraday():
+            async with AsyncTimeSeries(key=TestAlphaVantage._API_KEY_TEST,
+                                       output_format='pandas') as ts:
+                return await ts.get_intraday("MSFT", interval='1min')
+        loop = asyncio.new_event_loop()
+        try:
+            with self.serve_file_from_url(url):
+                data, _ = loop.run_until_complete(get_intraday())
+        finally:
+            loop.close()
+        self.assertIsInstance(
+            data, df, 'Result Data must be a pandas data frame')
+
+    @unittest.skipIf(sys.version_info < (3, 5), "Test valid for python 3.5+")
+    def test_async_http_errors(self):
+        """ Test that the asynchronous client raises HTTPError on an http
+        error status, retrying the server errors but not the client errors
+        """
+        import asyncio
+        from urllib.error import HTTPError
+        from ..alpha_vantage.async_support.timeseries import AsyncTimeSeries
+        url = "https://www.alphavantage.co/query?function=TIME_SERIES_INTRADAY&symbol=MSFT&interval=1min&apikey=test"
+
+        async def get_intraday():
+            async with AsyncTimeSeries(
+                    key=TestAlphaVantage._API_KEY_TEST,
+                    retry_policy=RetryPolicy(retries=1, backoff_factor=0)) \
+                    as ts:
+                return await ts.get_intraday("MSFT", interval='1min')
+        loop = asyncio.new_event_loop()
+        try:
+            with self.serve_file_from_url(url, statuses=(503,)):
+                data, _ = loop.run_until_complete(get_intraday())
+            self.assertIsInstance(
+                data, dict, 'Result Data must be a dictionary')
+            with self.serve_file_from_url(url, statuses=(404,)):
+                with self.assertRaises(HTTPError) as context:
+                    loop.run_until_complete(get_intraday())
+            self.assertEqual(context.exception.code, 404)
+        finally:
+            loop.close()
+
+    @unittest.skipIf(sys.version_info.major == 2, "Test valid for python 3")
+    @mock.patch('urllib.request.urlopen')
+    def test_time_series_daily_many(self, mock_urlopen):
+        """ Test that the batch version of a call yields every symbol and
+        collects the errors per symbol
+        """
+        ts = TimeSeries(key=TestAlphaVantage._API_KEY_TEST, retries=0)
+        url = "https://www.alphavantage.co/query?function=TIME_SERIES_INTRADAY&symbol=MSFT&interval=1min&apikey=test"
+        path_file = self.get_file_from_url(url)
+
+        def urlopen(request):
+            if 'symbol=WRONG' in request.get_full_url():
+                raise ValueError('Invalid API call')
+            return open(path_file)
+        mock_urlopen.side_effect = urlopen
+        results = {symbol: (result, error) for symbol, result, error in
+                   ts.get_intraday_many(['MSFT', 'WRONG', 'AAPL'],
+                                        interval='1min', max_workers=2)}
+        self.assertEqual(set(results), set(['MSFT', 'WRONG', 'AAPL']))
+        self.assertIsInstance(results['MSFT'][0][0], dict)
+        self.assertIsNone(results['MSFT'][1])
+        self.assertIsNone(results['WRONG'][0])
+        self.assertIsInstance(results['WRONG'][1], ValueError)
+
+    @mock.patch('time.time')
+    def test_rate_limiter_calls_per_minute(self, mock_time):
+        """ Test that the rate limiter makes the call wait once the calls per
+        minute are used up
+        """
+        mock_time.return_value = 1000.0
+        limiter = RateLimiter(calls_per_minute=2, calls_per_day=10)
+        self.assertEqual(limiter.reserve(), 0)
+        self.assertEqual(limiter.reserve(), 0)
+        self.assertAlmostEqual(limiter.reserve(), 30.0)
+        mock_time.return_value = 1030.0
+        self.assertEqual(limiter.reserve(), 0)
+
+    @mock.patch('time.time')
+    def test_rate_limiter_sqlite_backend_shared(self, mock_time):
+        """ Test that limiters on the same database share one budget
+        """
+        mock_time.return_value = 1000.0
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            db_path = path.join(tmp_dir, 'limiter.db')
+            first = RateLimiter(calls_per_minute=1,
+                                backend=SQLiteBackend(db_path))
+            second = RateLimiter(calls_per_minute=1,
+                                 backend=SQLiteBackend(db_path))
+            self.assertEqual(first.reserve(), 0)
+            self.assertGreater(second.reserve(), 0)
+        finally:
+            shutil.rmtree(tmp_dir)
+
+    @unittest.skipIf(sys.version_info.major == 2, "Test valid for python 3")
+    @mock.patch('time.sleep')
+    @mock.patch('urllib.request.urlopen')
+    def test_retry_invalid_symbol_not_retried(self, mock_urlopen, mock_sleep):
+        """ Test that an invalid call is not sent again
+        """
+        ts = TimeSeries(key=TestAlphaVantage._API_KEY_TEST)
+        mock_urlopen.return_value = io.StringIO(
+            u'{"Error Message": "Invalid API call."}')
+        with self.assertRaises(InvalidRequestError):
+            ts.get_daily("WRONG")
+        self.assertEqual(mock_urlopen.call_count, 1)
+        self.assertFalse(mock_sleep.called)
+
+    @unittest.skipIf(sys.version_info.major == 2, "Test valid for python 3")
+    @mock.patch('time.sleep')
+    @mock.patch('urllib.request.urlopen')
+    def test_retry_empty_response_with_backoff(self, mock_urlopen,
+                                               mock_sleep):
+        """ Test that a transient error is retried with an exponential
+        backoff
+        """
+        policy = RetryPolicy(retries=3, backoff_factor=1, jitter=False)
+        ts = TimeSeries(key=TestAlphaVantage._API_KEY_TEST,
+                        retry_policy=policy)
+        mock_urlopen.side_effect = lambda url: io.StringIO(u'{}')
+        with self.assertRaises(ValueError):
+            ts.get_daily("MSFT")
+        self.assertEqual(mock_urlopen.call_count, 4)
+        self.assertEqual([c[0][0] for c in mock_sleep.call_args_list],
+                         [1, 2, 4])
+
+    @unittest.skipIf(sys.version_info.major == 2, "Test valid for python 3")
+    @mock.patch('time.time')
+    @mock.patch('time.sleep')
+    @mock.patch('urllib.request.urlopen')
+    def test_throttle_parked_until_next_token(self, mock_urlopen, mock_sleep,
+                                              mock_time):
+        """ Test that a throttled call waits for the next token of the rate
+        limiter, even when information is not treated as an error
+        """
+        clock = [1000.0]
+        mock_time.side_effect = lambda: clock[0]
+        mock_sleep.side_effect = lambda seconds: clock.append(
+            clock.pop() + seconds)
+        url = "https://www.alphavantage.co/query?function=TIME_SERIES_INTRADAY&symbol=MSFT&interval=1min&apikey=test"
+        throttle = io.StringIO(
+            u'{"Information": "Thank you for using Alpha Vantage! Our '
+            u'standard API call frequency is 5 calls per minute and 500 '
+            u'calls per day."}')
+        with open(self.get_file_from_url(url)) as f:
+            mock_urlopen.side_effect = [throttle, f]
+            limiter = RateLimiter(calls_per_minute=5, calls_per_day=None)
+            ts = TimeSeries(key=TestAlphaVantage._API_KEY_TEST,
+                            rate_limiter=limiter, treat_info_as_error=False)
+            data, _ = ts.get_intraday("MSFT", interval='1min')
+        self.assertIsInstance(data, dict, 'Result Data must be a dictionary')
+        self.assertEqual(mock_sleep.call_args_list, [mock.call(12.0)])
+
+    @unittest.skipIf(sys.version_info.major == 2, "Test valid for python 3")
+    @mock.patch('time.time')
+    @mock.patch('time.sleep')
+    @mock.patch('urllib.request.urlopen')
+    def test_throttle_parking_capped(self, mock_urlopen, mock_sleep,
+                                     mock_time):
+        """ Test that without a rate limiter a throttled call is parked for
+        two minutes at most by default, and then raises
+        """
+        clock = [1000.0]
+        mock_time.side_effect = lambda: clock[0]
+        mock_sleep.side_effect = lambda seconds: clock.append(
+            clock.pop() + seconds)
+        mock_urlopen.side_effect = lambda request: io.StringIO(
+            u'{"Note": "Thank you for using Alpha Vantage! Our standard API '
+            u'call frequency is 5 calls per minute and 500 calls per day."}')
+        ts = TimeSeries(key=TestAlphaVantage._API_KEY_TEST)
+        with self.assertRaises(ValueError):
+            ts.get_intraday("MSFT", interval='1min')
+        self.assertEqual(mock_sleep.call_args_list,
+                         [mock.call(60), mock.call(60)])
+        self.assertEqual(mock_urlopen.call_count, 3)
+
+    @unittest.skipIf(sys.version_info.major == 2, "Test valid for python 3")
+    def test_gzip_response_decoded_and_counted(self):
+        """ Test that a gzip compressed response is decompressed and that the
+        bytes before and after decompression are counted
+        """
+        import gzip
+        url = "https://www.alphavantage.co/query?function=TIME_SERIES_INTRADAY&symbol=MSFT&interval=1min&apikey=test"
+        with open(self.get_file_from_url(url), 'rb') as f:
+            body = f.read()
+        compressed = gzip.compress(body)
+        response = mock.Mock()
+        response.info.return_value = {'Content-Encoding': 'gzip'}
+        response.read.side_effect = io.BytesIO(compressed).read
+        transport = mock.Mock()
+        transport.urlopen.return_value = response
+        ts = TimeSeries(key=TestAlphaVantage._API_KEY_TEST,
+                        transport=transport)
+        data, _ = ts.get_intraday("MSFT", interval='1min')
+        self.assertIsInstance(data, dict, 'Result Data must be a dictionary')
+        headers = transport.urlopen.call_args[1]['headers']
+        self.assertIn('gzip', headers['Accept-Encoding'])
+        self.assertEqual(ts.transfer_stats.wire_bytes, len(compressed))
+        self.assertEqual(ts.transfer_stats.decoded_bytes, len(body))
+
+    @unittest.skipIf(sys.version_info.major == 2, "Test valid for python 3")
+    @mock.patch('urllib.request.urlopen')
+    def test_single_flight_coalesces_calls(self, mock_urlopen):
+        """ Test that identical calls in flight at the same time from several
+        threads and instances are sent only once
+        """
+        url = "https://www.alphavantage.co/query?function=TIME_SERIES_INTRADAY&symbol=MSFT&interval=1min&apikey=test"
+        entered = threading.Event()
+        release = threading.Event()
+
+        def urlopen(request):
+            entered.set()
+            release.wait(5)
+            return open(self.get_file_from_url(url))
+        mock_urlopen.side_effect = urlopen
+        single_flight = SingleFlight()
+        results = []
+
+        def get_intraday(key):
+            ts = TimeSeries(key=key, single_flight=single_flight)
+            results.append(ts.get_intraday("MSFT", interval='1min'))
+        threads = [threading.Thread(target=get_intraday, args=(key,))
+                   for key in ['first', 'second', 'third']]
+        threads[0].start()
+        entered.wait(5)
+        for thread in threads[1:]:
+            thread.start()
+        time.sleep(0.1)
+        release.set()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(mock_urlopen.call_count, 1)
+        self.assertEqual(len(results), 3)
+        self.assertTrue(all(result[0] is results[0][0] for result in results))
+
+    @unittest.skipIf(sys.version_info.major == 2, "Test valid for python 3")
+    @mock.patch('urllib.request.urlopen')
+    def test_single_flight_separates_output_formats(self, mock_urlopen):
+        """ Test that identical calls in flight from instances with different
+        output formats are not coalesced, as their responses are parsed
+        differently
+        """
+        url = "https://www.alphavantage.co/query?function=TIME_SERIES_INTRADAY&symbol=MSFT&interval=1min&apikey=test"
+        entered = threading.Event()
+        release = threading.Event()
+
+        def urlopen(request):
+            entered.set()
+            release.wait(5)
+            return open(self.get_file_from_url(url))
+        mock_urlopen.side_effect = urlopen
+        single_flight = SingleFlight()
+        results = {}
+
+        def get_intraday(output_format):
+            ts = TimeSeries(key=TestAlphaVantage._API_KEY_TEST,
+                            output_format=output_format,
+                            single_flight=single_flight)
+            results[output_format] = ts.get_intraday("MSFT", interval='1min')
+        threads = [threading.Thread(target=get_intraday, args=(output_format,))
+                   for output_format in ['pandas', 'json']]
+        threads[0].start()
+        entered.wait(5)
+        threads[1].start()
+        time.sleep(0.1)
+        release.set()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(mock_urlopen.call_count, 2)
+        self.assertIsInstance(results['pandas'][0], df)
+        self.assertIsInstance(results['json'][0], dict)
+
+    @unittest.skipIf(sys.version_info.major == 2, "Test valid for python 3")
+    @mock.patch('random.random')
+    @mock.patch('time.sleep')
+    @mock.patch('urllib.request.urlopen')
+    def test_key_pool_fails_over_throttled_key(self, mock_urlopen, mock_sleep,
+                                               mock_random):
+        """ Test that a throttled key is failed over to another key of the
+        pool without waiting
+        """
+        url = "https://www.alphavantage.co/query?function=TIME_SERIES_INTRADAY&symbol=MSFT&interval=1min&apikey=test"
+        # The heaviest key goes first with a constant random number
+        mock_random.return_value = 0.5
+        pool = KeyPool({'throttled': 2, 'spare': 1})
+        used_keys = []
+
+        def urlopen(request):
+            used_keys.append(request.get_full_url().split('apikey=')[1])
+            if 'apikey=throttled' in request.get_full_url():
+                return io.StringIO(u'{"Note": "Our standard API call '
+                                   u'frequency is 5 calls per minute."}')
+            return open(self.get_file_from_url(url))
+        mock_urlopen.side_effect = urlopen
+        ts = TimeSeries(key=pool)
+        data, _ = ts.get_intraday("MSFT", interval='1min')
+        self.assertIsInstance(data, dict, 'Result Data must be a dictionary')
+        self.assertEqual(used_keys, ['throttled&datatype=json',
+                                     'spare&datatype=json'])
+        self.assertEqual(mock_sleep.call_args_list, [mock.call(0)])
+        self.assertEqual(pool.remaining(), {'throttled': 0, 'spare': 4})
+
+    @unittest.skipIf(sys.version_info.major == 2, "Test valid for python 3")
+    @mock.patch('time.time')
+    @mock.patch('time.sleep')
+    @mock.patch('urllib.request.urlopen')
+    def test_deadline_stops_retries(self, mock_urlopen, mock_sleep,
+                                    mock_time):
+        """ Test that the deadline of a call bounds the timeout of the
+        requests and stops the retries that would go past it
+        """
+        clock = [1000.0]
+        mock_time.side_effect = lambda: clock[0]
+        mock_sleep.side_effect = lambda seconds: clock.append(
+            clock.pop() + seconds)
+        timeouts = []
+
+        def urlopen(request, timeout=None):
+            timeouts.append(timeout)
+            return io.StringIO(u'{}')
+        mock_urlopen.side_effect = urlopen
+        policy = RetryPolicy(retries=5, backoff_factor=1, jitter=False)
+        ts = TimeSeries(key=TestAlphaVantage._API_KEY_TEST,
+                        retry_policy=policy)
+        with self.assertRaises(ValueError):
+            ts.get_daily("MSFT", deadline=4)
+        self.assertEqual(timeouts, [4.0, 3.0, 1.0])
+        self.assertEqual([c[0][0] for c in mock_sleep.call_args_list],
+                         [1, 2])
+
+    @unittest.skipIf(sys.version_info.major == 2, "Test valid for python 3")
+    @mock.patch('time.time')
+    @mock.patch('time.sleep')
+    @mock.patch('urllib.request.urlopen')
+    def test_deadline_bounds_rate_limiter_wait(self, mock_urlopen, mock_sleep,
+                                               mock_time):
+        """ Test that a call whose rate limiter has no budget before its
+        deadline fails right away instead of waiting for it
+        """
+        clock = [1000.0]
+        mock_time.side_effect = lambda: clock[0]
+        mock_sleep.side_effect = lambda seconds: clock.append(
+            clock.pop() + seconds)
+        url = "https://www.alphavantage.co/query?function=TIME_SERIES_INTRADAY&symbol=MSFT&interval=1min&apikey=test"
+        mock_urlopen.side_effect = lambda request, timeout=None: open(
+            self.get_file_from_url(url))
+        for limits in ({'rate_limiter': RateLimiter(calls_per_minute=1)},
+                       {'key': KeyPool(['first'], calls_per_minute=1)}):
+            clock[0] = 1000.0
+            mock_urlopen.reset_mock()
+            ts = TimeSeries(**dict({'key': TestAlphaVantage._API_KEY_TEST},
+                                   **limits))
+            ts.get_intraday("MSFT", interval='1min', deadline=1)
+            with self.assertRaises(socket.timeout):
+                ts.get_intraday("MSFT", interval='1min', deadline=1)
+            self.assertEqual(mock_urlopen.call_count, 1)
+            self.assertLess(clock[0], 1001.0)
+
+    @unittest.skipIf(sys.version_info.major == 2, "Test valid for python 3")
+    @mock.patch('urllib.request.urlopen')
+    def test_hedged_call_uses_first_response(self, mock_urlopen):
+        """ Test that a slow call is sent a second time after hedge_after
+        seconds and that the fastest response is used, both calls having a
+        timeout even without deadline
+        """
+        url = "https://www.alphavantage.co/query?function=TIME_SERIES_INTRADAY&symbol=MSFT&interval=1min&apikey=test"
+        release = threading.Event()
+        calls = []
+        timeouts = []
+
+        def urlopen(request, timeout=None):
+            calls.append(request.get_full_url())
+            timeouts.append(timeout)
+            if len(calls) == 1:
+                # The first call hangs until the hedged one is done
+                release.wait(5)
+                return io.StringIO(u'{}')
+            return open(self.get_file_from_url(url))
+        mock_urlopen.side_effect = urlopen
+        ts = TimeSeries(key=TestAlphaVantage._API_KEY_TEST, hedge_after=0.05)
+        try:
+            data, _ = ts.get_intraday("MSFT", interval='1min')
+        finally:
+            release.set()
+        self.assertIsInstance(data, dict, 'Result Data must be a dictionary')
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(calls[0], calls[1])
+        self.assertEqual(timeouts[0], 60)
+        self.assertTrue(0 < timeouts[1] <= 60)
+
+    @mock.patch('time.time')
+    def test_hedge_gives_back_its_token(self, mock_time):
+        """ Test that the token a duplicate call took from the rate limiter
+        is given back when the key pool has no key left for it
+        """
+        mock_time.return_value = 1000.0
+        url = "https://www.alphavantage.co/query?function=TIME_SERIES_INTRADAY&symbol=MSFT&interval=1min"
+        limiter = RateLimiter(calls_per_minute=5, calls_per_day=None)
+        pool = KeyPool(['first'], calls_per_minute=1, calls_per_day=None)
+        ts = TimeSeries(key=pool, rate_limiter=limiter)
+        self.assertEqual(pool.reserve()[0], 'first')
+        self.assertIsNone(ts._reserve_hedge(url))
+        self.assertEqual(limiter.remaining(), 5)
+        self.assertEqual(pool.remaining(), {'first': 0})
+
+    @unittest.skipIf(sys.version_info.major == 2, "Test valid for python 3")
+    @mock.patch('time.time')
+    @mock.patch('urllib.request.urlopen')
+    def test_disk_cache_hit_until_expired(self, mock_urlopen, mock_time):
+        """ Test that a cached response skips the network, whatever the api
+        key, until the ttl of its function expires
+        """
+        mock_time.return_value = 1000.0
+        url = "https://www.alphavantage.co/query?function=TIME_SERIES_INTRADAY&symbol=MSFT&interval=1min&apikey=test"
+        mock_urlopen.side_effect = lambda request: open(
+            self.get_file_from_url(url))
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            cache = DiskCache(path.join(tmp_dir, 'cache.db'),
+                              ttls={'TIME_SERIES_INTRADAY': 60})
+            first = TimeSeries(key='first', cache=cache)
+            second = TimeSeries(key='second', cache=cache)
+            data, _ = first.get_intraday("MSFT", interval='1min')
+            cached_data, _ = second.get_intraday("MSFT", interval='1min')
+            self.assertEqual(mock_urlopen.call_count, 1)
+            self.assertEqual(cached_data, data)
+            mock_time.return_value = 1061.0
+            second.get_intraday("MSFT", interval='1min')
+            self.assertEqual(mock_urlopen.call_count, 2)
+        finally:
+            shutil.rmtree(tmp_dir)
+
+    @unittest.skipIf(sys.version_info.major == 2, "Test valid for python 3")
+    @mock.patch('urllib.request.urlopen')
+    def test_result_cache_copy_on_read(self, mock_urlopen):
+        """ Test that a cached data frame skips the call and is copied, so
+        that modifying it does not change the cache
+        """
+        url = "https://www.alphavantage.co/query?function=TIME_SERIES_INTRADAY&symbol=MSFT&interval=1min&apikey=test"
+        mock_urlopen.side_effect = lambda request: open(
+            self.get_file_from_url(url))
+        result_cache = ResultCache()
+        ts = TimeSeries(key=TestAlphaVantage._API_KEY_TEST,
+                        output_format='pandas', result_cache=result_cache)
+        data, _ = ts.get_intraday("MSFT", interval='1min')
+        data.iloc[0, 0] = -1.0
+        cached_data, _ = ts.get_intraday("MSFT", interval='1min')
+        self.assertEqual(mock_urlopen.call_count, 1)
+        self.assertIsInstance(cached_data, df)
+        self.assertNotEqual(cached_data.iloc[0, 0], -1.0)
+        stats = result_cache.stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['entries']),
+                         (1, 1, 1))
+
+    def test_result_cache_evicts_least_recently_used(self):
+        """ Test that the result cache is bounded by the size of its entries
+        """
+        output = ({str(i): {'close': '1.0'} for i in range(10)}, None)
+        result_cache = ResultCache(max_bytes=8000)
+        for symbol in ['first', 'second', 'third']:
+            result_cache.set(('function=TIME_SERIES_DAILY&symbol=' + symbol,),
+                             output)
+        self.assertLessEqual(result_cache.stats()['bytes'], 8000)
+        self.assertGreater(result_cache.stats()['evictions'], 0)
+        self.assertIsNone(result_cache.get(
+            ('function=TIME_SERIES_DAILY&symbol=first',)))
+        self.assertEqual(result_cache.get(
+            ('function=TIME_SERIES_DAILY&symbol=third',)), output)
+
+    @unittest.skipIf(sys.version_info.major == 2, "Test valid for python 3")
+    @mock.patch('urllib.request.urlopen')
+    def test_history_sync_merges_compact_updates(self, mock_urlopen):
+        """ Test that a stored full series is refreshed with compact calls,
+        and downloaded again when the compact series leaves a gap
+        """
+        def daily(output_size, dates):
+            return json.dumps({
+                'Meta Data': {'4. Output Size': output_size},
+                'Time Series (Daily)': {date: {'4. close': close}
+                                        for date, close in dates}})
+        responses = {
+            'full': [daily('Full size', [('2018-01-01', '1.0'),
+                                         ('2018-01-02', '2.0')]),
+                     daily('Full size', [('2018-01-05', '5.0')])],
+            'compact': [daily('Compact', [('2018-01-02', '2.5'),
+                                          ('2018-01-03', '3.0')]),
+                        daily('Compact', [('2018-01-05', '5.0')])]}
+        sizes = []
+
+        def urlopen(request):
+            size = request.get_full_url().split('outputsize=')[1][:4]
+            size = 'full' if size == 'full' else 'compact'
+            sizes.append(size)
+            return io.StringIO(responses[size].pop(0))
+        mock_urlopen.side_effect = urlopen
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            ts = TimeSeries(key=TestAlphaVantage._API_KEY_TEST,
+                            history_store=HistoryStore(
+                                path.join(tmp_dir, 'history.db')))
+            ts.get_daily("MSFT", outputsize='full')
+            data, meta_data = ts.get_daily("MSFT", outputsize='full')
+            self.assertEqual(sizes, ['full', 'compact'])
+            # Newest first, like the responses of the api
+            self.assertEqual(list(data), ['2018-01-03', '2018-01-02',
+                                          '2018-01-01'])
+            self.assertEqual(data['2018-01-02']['4. close'], '2.5')
+            self.assertEqual(meta_data['4. Output Size'], 'Full size')
+            data, _ = ts.get_daily("MSFT", outputsize='full')
+            self.assertEqual(sizes, ['full', 'compact', 'compact', 'full'])
+            self.assertEqual(sorted(data), ['2018-01-05'])
+        finally:
+            shutil.rmtree(tmp_dir)
+
+    def test_date_index_time_zone(self):
+        """ Test that the dates are localized in the time zone of the meta
+        data, the ambiguous ones becoming NaT, and left naive when the time
+        zone is unknown
+        """
+        ts = TimeSeries(key='test', output_format='pandas')
+        dates = ['2018-11-04 01:30:00', '2018-11-05 10:00:00']
+        index = ts._date_index(dates, {'6. Time Zone': 'US/Eastern'})
+        self.assertEqual(str(index.tz), 'US/Eastern')
+        self.assertTrue(index[:1].isna().all())
+        self.assertEqual(index[1].hour, 10)
+        index = ts._date_index(dates, {'6. Time Zone': 'Nowhere/Unknown'})
+        self.assertIsNone(index.tz)
+        self.assertEqual(len(index.dropna()), 2)
+
+    @unittest.skipIf(sys.version_info.major == 2, "Test valid for python 3")
+    @mock.patch('urllib.request.urlopen')
+    def test_column_store_read_through(self, mock_urlopen):
+        """ Test that a stored series is read back from the memory mapped
+        columns, equal to the data frame built from the api response
+        """
+        url = "https://www.alphavantage.co/query?function=TIME_SERIES_INTRADAY&symbol=MSFT&interval=1min&apikey=test"
+        mock_urlopen.side_effect = lambda request: open(
+            self.get_file_from_url(url))
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            store = ColumnStore(path.join(tmp_dir, 'store'))
+            first = TimeSeries(key='first', output_format='pandas',
+                               column_store=store)
+            second = TimeSeries(key='second', output_format='pandas',
+                                column_store=store)
+            data, meta_data = first.get_intraday("MSFT", interval='1min')
+            stored_data, stored_meta_data = second.get_intraday(
+                "MSFT", interval='1min')
+            self.assertEqual(mock_urlopen.call_count, 1)
+            self.assertTrue(stored_data.equals(data))
+            self.assertTrue(stored_data.index.equals(data.index))
+            self.assertEqual(stored_meta_data, meta_data)
+        finally:
+            shutil.rmtree(tmp_dir)
+
+    @unittest.skipIf(sys.version_info.major == 2, "Test valid for python 3")
+    @mock.patch('urllib.request.urlopen')
+    def test_column_store_volumes_and_failed_swap(self, mock_urlopen):
+        """ Test that the volumes are stored as int64 and read back as the
+        data frame that was stored, and that a store losing the swap of its
+        directory to another process drops its copy
+        """
+        url = "https://www.alphavantage.co/query?function=TIME_SERIES_INTRADAY&symbol=MSFT&interval=1min&apikey=test"
+        mock_urlopen.side_effect = lambda request: open(
+            self.get_file_from_url(url))
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            store = ColumnStore(path.join(tmp_dir, 'store'))
+            ts = TimeSeries(key='test', output_format='pandas',
+                            column_store=store)
+            data, meta_data = ts.get_intraday("MSFT", interval='1min')
+            directory, = [path.join(tmp_dir, 'store', name) for name
+                          in os.listdir(path.join(tmp_dir, 'store'))]
+            with open(path.join(directory, 'meta.json')) as meta:
+                key = json.load(meta)['key']
+            volume = list(data.columns).index('5. volume')
+            self.assertEqual(numpy.load(path.join(
+                directory, '{}.npy'.format(volume))).dtype, numpy.int64)
+            self.assertEqual(numpy.load(path.join(
+                directory, '0.npy')).dtype, numpy.float64)
+            stored_data, _ = store.get(key)
+            self.assertTrue(stored_data.equals(data))
+            with mock.patch('os.rename', side_effect=OSError):
+                self.assertFalse(store.set(key, data, meta_data))
+            self.assertEqual(os.listdir(path.join(tmp_dir, 'store')),
+                             [path.basename(directory)])
+        finally:
+            shutil.rmtree(tmp_dir)
+
+    @unittest.skipIf(sys.version_info.major == 2, "Test valid for python 3")
+    @mock.patch('time.time')
+    @mock.patch('urllib.request.urlopen')
+    def test_result_cache_revalidated_by_last_refreshed(self, mock_urlopen,
+                                                        mock_time):
+        """ Test that an expired output is given back without parsing the
+        response again when its last refreshed time did not change, and that
+        the response is parsed when the output was evicted meanwhile
+        """
+        mock_time.return_value = 1000.0
+        url = "https://www.alphavantage.co/query?function=TIME_SERIES_INTRADAY&symbol=MSFT&interval=1min&apikey=test"
+        mock_urlopen.side_effect = lambda request: open(
+            self.get_file_from_url(url))
+        result_cache = ResultCache()
+        ts = TimeSeries(key=TestAlphaVantage._API_KEY_TEST,
+                        output_format='pandas', result_cache=result_cache)
+        with mock.patch.object(ts, '_parse_response',
+                               wraps=ts._parse_response) as mock_parse:
+            data, _ = ts.get_intraday("MSFT", interval='1min')
+            mock_time.return_value = 1061.0
+            revalidated_data, _ = ts.get_intraday("MSFT", interval='1min')
+            self.assertEqual(mock_urlopen.call_count, 2)
+            self.assertEqual(mock_parse.call_count, 1)
+        self.assertTrue(revalidated_data.equals(data))
+        self.assertEqual(result_cache.stats()['revalidations'], 1)
+        ts.get_intraday("MSFT", interval='1min')
+        self.assertEqual(mock_urlopen.call_count, 2)
+        # Evicted while the revalidation is in flight, the response is parsed
+
+        def urlopen(request):
+            result_cache.clear()
+            return open(self.get_file_from_url(url))
+        mock_urlopen.side_effect = urlopen
+        mock_time.return_value = 1122.0
+        refetched_data, _ = ts.get_intraday("MSFT", interval='1min')
+        self.assertEqual(mock_urlopen.call_count, 3)
+        self.assertTrue(refetched_data.equals(data))
+
+    @unittest.skipIf(sys.version_info.major == 2, "Test valid for python 3")
+    @mock.patch('urllib.request.urlopen')
+    def test_symbol_directory_rejects_before_sending(self, mock_urlopen):
+        """ Test that unknown currencies and symbols rejected by the api are
+        rejected without calling the api
+        """
+        lists = {AlphaVantage._ALPHA_VANTAGE_DIGITAL_CURRENCY_LIST:
+                 b'currency code,currency name\nBTC,Bitcoin\n',
+                 AlphaVantage._ALPHA_VANTAGE_PHYSICAL_CURRENCY_LIST:
+                 b'currency code,currency name\nUSD,United States Dollar\n'}
+        transport = mock.Mock()
+        transport.urlopen.side_effect = lambda url: io.BytesIO(lists[url])
+        url = "https://www.alphavantage.co/query?function=TIME_SERIES_INTRADAY&symbol=MSFT&interval=1min&apikey=test"
+
+        def urlopen(request):
+            if 'symbol=MSFT&' in request.full_url:
+                return open(self.get_file_from_url(url))
+            return io.StringIO(u'{"Error Message": "Invalid API call."}')
+        mock_urlopen.side_effect = urlopen
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            directory = SymbolDirectory(path.join(tmp_dir, 'symbols.db'),
+                                        transport=transport)
+            cc = CryptoCurrencies(key=TestAlphaVantage._API_KEY_TEST,
+                                  symbol_directory=directory)
+            with self.assertRaises(InvalidRequestError):
+                cc.get_digital_currency_daily(symbol='BTX', market='USD')
+            ts = TimeSeries(key=TestAlphaVantage._API_KEY_TEST,
+                            symbol_directory=directory)
+            ts.get_intraday("MSFT", interval='1min')
+            for _ in range(2):
+                with self.assertRaises(InvalidRequestError):
+                    ts.get_intraday("MSFTT", interval='1min')
+            self.assertEqual(mock_urlopen.call_count, 2)
+            self.assertEqual(transport.urlopen.call_count, 1)
+        finally:
+            shutil.rmtree(tmp_dir)
+
+    @unittest.skipIf(sys.version_info.major == 2, "Test valid for python 3")
+    @mock.patch('urllib.request.urlopen')
+    def test_symbol_directory_keeps_symbol_of_invalid_call(self,
+                                                           mock_urlopen):
+        """ Test that a call rejected for another parameter than its symbol
+        does not make the directory reject the symbol
+        """
+        url = "https://www.alphavantage.co/query?function=TIME_SERIES_INTRADAY&symbol=MSFT&interval=1min&apikey=test"
+
+        def urlopen(request):
+            if 'interval=1min' in request.full_url:
+                return open(self.get_file_from_url(url))
+            return io.StringIO(u'{"Error Message": "Invalid API call."}')
+        mock_urlopen.side_effect = urlopen
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            directory = SymbolDirectory(path.join(tmp_dir, 'symbols.db'))
+            ts = TimeSeries(key=TestAlphaVantage._API_KEY_TEST,
+                            symbol_directory=directory)
+            with self.assertRaises(InvalidRequestError):
+                ts.get_intraday("MSFT", interval='2min')
+            data, _ = ts.get_intraday("MSFT", interval='1min')
+            self.assertTrue(data)
+            self.assertEqual(mock_urlopen.call_count, 2)
+        finally:
+            shutil.rmtree(tmp_dir)
+
+    @unittest.skipIf(sys.version_info.major == 2, "Test valid for python 3")
+    @mock.patch('urllib.request.urlopen')
+    def test_record_and_replay_transport(self, mock_urlopen):
+        """ Test that the recorded responses are replayed without network,
+        whatever the api key
+        """
+        url = "https://www.alphavantage.co/query?function=TIME_SERIES_INTRADAY&symbol=MSFT&interval=1min&apikey=test"
+        mock_urlopen.side_effect = lambda request: open(
+            self.get_file_from_url(url), 'rb')
+        tmp_dir = tempfile.mkdtemp()
+        try:
+            archive = path.join(tmp_dir, 'archive')
+            ts = TimeSeries(key=TestAlphaVantage._API_KEY_TEST,
+                            transport=RecordingTransport(archive))
+            data, _ = ts.get_intraday("MSFT", interval='1min')
+            replay = ReplayTransport(archive)
+            ts = TimeSeries(key='other', transport=replay)
+            replayed_data, _ = ts.get_intraday("MSFT", interval='1min')
+            self.assertEqual(replayed_data, data)
+            self.assertEqual(mock_urlopen.call_count, 1)
+            with self.assertRaises(HTTPError):
+                ts.get_daily("MSFT")
+            replay.close()
+        finally:
+            shutil.rmtree(tmp_dir)
+
+    def test_series_parser_streamed_in_chunks(self):
+        """ Test that a time series parsed chunk by chunk gives the data frame
+        built from the whole json response, and that other responses are
+        left to the json parser
+        """
+        url = "https://www.alphavantage.co/query?function=TIME_SERIES_INTRADAY&symbol=MSFT&interval=1min&apikey=test"
+        with open(self.get_file_from_url(url), 'rb') as f:
+            body = f.read()
+        parser = SeriesParser(window=256)
+        for start in range(0, len(body), 100):
+            parser.feed(body[start:start + 100])
+        response = parser.close()
+        expected = json.loads(body.decode('utf-8'))
+        self.assertEqual(response['Meta Data'], expected['Meta Data'])
+        ts = TimeSeries(key=TestAlphaVantage._API_KEY_TEST,
+                        output_format='pandas')
+        data = ts._data_frame(response['Time Series (1min)'])
+        self.assertTrue(data.equals(ts._data_frame(
+            expected['Time Series (1min)'])))
+        parser = SeriesParser()
+        parser.feed(b'{"Error Message": "Invalid API call."}')
+        self.assertIsNone(parser.close())
+        self.assertEqual(parser.text,
+                         u'{"Error Message": "Invalid API call."}')
+        parser = SeriesParser()
+        parser.feed(body[:len(body) // 2])
+        with self.assertRaises(ValueError):
+            parser.close()
+
+    @unittest.skipIf(sys.version_info.major == 2, "Test valid for python 3")
+    @mock.patch('urllib.request.urlopen')
+    def test_time_series_intraday_numpy(self, mock_urlopen):
+        """ Test that the numpy output gives a float64 array per column,
+        holding the values of the pandas output
+        """
+        url = "https://www.alphavantage.co/query?function=TIME_SERIES_INTRADAY&symbol=MSFT&interval=1min&apikey=test"
+        mock_urlopen.side_effect = lambda request: open(
+            self.get_file_from_url(url))
+        ts = TimeSeries(key=TestAlphaVantage._API_KEY_TEST,
+                        output_format='numpy')
+        data, meta_data = ts.get_intraday("MSFT", interval='1min')
+        ts = TimeSeries(key=TestAlphaVantage._API_KEY_TEST,
+                        output_format='pandas', indexing_type='date')
+        data_pandas, _ = ts.get_intraday("MSFT", interval='1min')
+        self.assertEqual(list(data), ['date'] + list(data_pandas.columns))
+        self.assertEqual(list(data['date']),
+                         list(data_pandas.index.tz_localize(None).values))
+        for column in data_pandas.columns:
+            self.assertEqual(data[column].dtype, 'float64')
+            self.assertEqual(list(data[column]), list(data_pandas[column]))
+        self.assertEqual(meta_data['2. Symbol'], 'MSFT')
+
+    @unittest.skipIf(sys.version_info.major == 2, "Test valid for python 3")
+    @mock.patch('urllib.request.urlopen')
+    def test_csv_rows_and_columns(self, mock_urlopen):
+        """ Test that csv responses give typed rows with the csv output and
+        data frames with the csv data type
+        """
+        body = (b'timestamp,open,high,low,close,volume\r\n'
+                b'2018-01-05 16:00:00,88.1900,88.2000,88.1200,88.1900,'
+                b'1083614\r\n'
+                b'2018-01-05 15:59:00,88.1600,88.2000,88.1500,88.1900,'
+                b'162349\r\n')
+        mock_urlopen.side_effect = lambda request: io.BytesIO(body)
+        ts = TimeSeries(key=TestAlphaVantage._API_KEY_TEST,
+                        output_format='csv')
+        rows, meta_data = ts.get_intraday("MSFT", interval='1min')
+        self.assertIn('datatype=csv', mock_urlopen.call_args[0][0].full_url)
+        self.assertIsNone(meta_data)
+        self.assertEqual(list(rows), [
+            ['timestamp', 'open', 'high', 'low', 'close', 'volume'],
+            ['2018-01-05 16:00:00', 88.19, 88.2, 88.12, 88.19, 1083614.0],
+            ['2018-01-05 15:59:00', 88.16, 88.2, 88.15, 88.19, 162349.0]])
+        ts = TimeSeries(key=TestAlphaVantage._API_KEY_TEST,
+                        output_format='pandas', datatype='csv')
+        data, meta_data = ts.get_intraday("MSFT", interval='1min')
+        self.assertIsNone(meta_data)
+        self.assertEqual(list(data.columns),
+                         ['open', 'high', 'low', 'close', 'volume'])
+        self.assertEqual(list(data.index.strftime('%Y-%m-%d %H:%M:%S')),
+                         ['2018-01-05 15:59:00', '2018-01-05 16:00:00'])
+        self.assertEqual(list(data['volume']), [162349.0, 1083614.0])
+        mock_urlopen.side_effect = lambda request: io.BytesIO(
+            b'{"Error Message": "Invalid API call."}')
+        with self.assertRaises(InvalidRequestError):
+            ts.get_intraday("MSFTT", interval='1min')
+
+    @unittest.skipIf(sys.version_info.major == 2, "Test valid for python 3")
+    @mock.patch('urllib.request.urlopen')
+    def test_schema_normalized_columns_and_drift(self, mock_urlopen):
+        """ Test that the columns get the normalized names of their schema,
+        and that a response not matching its schema warns
+        """
+        url = "https://www.alphavantage.co/query?function=TIME_SERIES_INTRADAY&symbol=MSFT&interval=1min&apikey=test"
+        with open(self.get_file_from_url(url)) as f:
+            body = f.read()
+        mock_urlopen.side_effect = lambda request: io.StringIO(body)
+        ts = TimeSeries(key=TestAlphaVantage._API_KEY_TEST,
+                        output_format='pandas', normalize_columns=True)
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter('always')
+            data, _ = ts.get_intraday("MSFT", interval='1min')
+        self.assertEqual(list(data.columns),
+                         ['open', 'high', 'low', 'close', 'volume'])
+        self.assertEqual(caught, [])
+        mock_urlopen.side_effect = lambda request: io.StringIO(
+            body.replace('"5. volume"', '"5. shares"'))
+        with self.assertWarns(SchemaDriftWarning):
+            data, _ = ts.get_intraday("MSFT", interval='1min')
+        self.assertEqual(list(data.columns),
+                         ['open', 'high', 'low', 'close', 'shares'])
+
+    @unittest.skipIf(sys.version_info.major == 2, "Test valid for python 3")
+    @mock.patch('urllib.request.urlopen')
+    def test_compact_dtypes(self, mock_urlopen):
+        """ Test that the compact modes store the volumes as integers and the
+        prices as float32, and that they use less memory
+        """
+        url = "https://www.alphavantage.co/query?function=TIME_SERIES_INTRADAY&symbol=MSFT&interval=1min&apikey=test"
+        with open(self.get_file_from_url(url)) as f:
+            body = f.read()
+        mock_urlopen.side_effect = lambda request: io.StringIO(body)
+        outputs = {}
+        for mode in COMPACT_MODES:
+            ts = TimeSeries(key=TestAlphaVantage._API_KEY_TEST,
+                            output_format='pandas', compact=mode)
+            outputs[mode], _ = ts.get_intraday("MSFT", interval='1min')
+        full = outputs[None]
+        self.assertEqual(list(full.dtypes), ['float64'] * 5)
+        self.assertEqual(list(outputs['lossless'].dtypes),
+                         ['float64'] * 4 + ['uint32'])
+        self.assertEqual(list(outputs['float32'].dtypes),
+                         ['float32'] * 4 + ['uint32'])
+        self.assertTrue((outputs['lossless'] == full).all().all())
+        self.assertEqual(list(memory_by_mode(full).values()),
+                         [memory_usage(outputs[mode])
+                          for mode in COMPACT_MODES])
+        self.assertLess(memory_usage(outputs['float32']),
+                        memory_usage(outputs['lossless']))
+        panel = concat_symbols([('MSFT', full), ('AAPL', full)])
+        self.assertEqual(len(panel), 2 * len(full))
+        self.assertEqual(str(panel['symbol'].dtype), 'category')
+        self.assertEqual(list(panel['symbol'].cat.categories),
+                         ['MSFT', 'AAPL'])
+        with self.assertRaises(ValueError):
+            TimeSeries(key=TestAlphaVantage._API_KEY_TEST, compact='float16')
+
+    @unittest.skipIf(sys.version_info.major == 2, "Test valid for python 3")
+    @mock.patch('urllib.request.urlopen')
+    def test_json_decoders(self, mock_urlopen):
+        """ Test that every installed json decoder gives the same output, and
+        that the decoder can be given as a function
+        """
+        url = "https://www.alphavantage.co/query?function=TIME_SERIES_INTRADAY&symbol=MSFT&interval=1min&apikey=test"
+        with open(self.get_file_from_url(url)) as f:
+            body = f.read()
+        mock_urlopen.side_effect = lambda request: io.StringIO(body)
+        self.assertIn('json', available_decoders())
+        self.assertIs(get_decoder('json'), json.loads)
+        if 'orjson' not in available_decoders():
+            # ujson is not measured, it is never the automatic choice
+            self.assertIs(get_decoder(), json.loads)
+        expected, _ = TimeSeries(key=TestAlphaVantage._API_KEY_TEST,
+                                 json_decoder='json').get_intraday(
+            "MSFT", interval='1min')
+        for name in available_decoders():
+            for output_format in ('json', 'pandas'):
+                ts = TimeSeries(key=TestAlphaVantage._API_KEY_TEST,
+                                output_format=output_format,
+                                json_decoder=name)
+                data, _ = ts.get_intraday("MSFT", interval='1min')
+                if output_format == 'pandas':
+                    self.assertEqual(len(data), len(expected))
+                else:
+                    self.assertEqual(data, expected)
+        loads = mock.Mock(side_effect=json.loads)
+        ts = TimeSeries(key=TestAlphaVantage._API_KEY_TEST,
+                        json_decoder=loads)
+        data, _ = ts.get_intraday("MSFT", interval='1min')
+        self.assertEqual(data, expected)
+        loads.assert_called_once_with(body)
+        with self.assertRaises(ValueError):
+            TimeSeries(key=TestAlphaVantage._API_KEY_TEST,
+                       json_decoder='yaml')
+
+    @unittest.skipIf(sys.version_info.major == 2, "Test valid for python 3")
+    def test_lazy_module(self):
+        """ Test that importing the time series client and doing a call with
+        the json output, in a fresh interpreter, imports neither pandas nor
+        numpy
+        """
+        self.assertTrue(module_found('pandas'))
+        self.assertFalse(module_found('not_an_installed_module'))
+        url = "https://www.alphavantage.co/query?function=TIME_SERIES_INTRADAY&symbol=MSFT&interval=1min&apikey=test"
+        code = '\n'.join((
+            'import sys',
+            'from unittest import mock',
+            'from alpha_vantage.timeseries import TimeSeries',
+            'with mock.patch("urllib.request.urlopen",',
+            '                side_effect=lambda request: open(sys.argv[1])):',
+            '    data, _ = TimeSeries(key="test").get_intraday(',
+            '        "MSFT", interval="1min")',
+            'assert isinstance(data, dict) and data',
+            'print(" ".join(name for name in ("pandas", "numpy")',
+            '               if name in sys.modules))'))
+        root = path.dirname(path.dirname(path.abspath(__file__)))
+        output = subprocess.check_output(
+            [sys.executable, '-c', code, self.get_file_from_url(url)],
+            cwd=root)
+        self.assertEqual(output.decode('utf-8').strip(), '')